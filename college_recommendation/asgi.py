@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'college_recommendation.settings')
+# Route the read-heavy pages to recommendations.async_views.
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Compile templates, prime caches and connect before the first request
+# when WARMUP_ON_STARTUP is on (see recommendations.warmup).
+from recommendations.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
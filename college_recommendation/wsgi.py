@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'college_recommendation.settings')
 
 application = get_wsgi_application()
+
+# Compile templates, prime caches and connect before the first request
+# when WARMUP_ON_STARTUP is on (see recommendations.warmup).
+from recommendations.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -1,23 +1,73 @@
 from django.contrib import admin
 from django import forms
-from .models import Student, College, Ranking, CollegeRating
+from .models import Student, College, Ranking, CollegeRating, Course, Facility, RecommendationJob, split_list
+from .search import filter_ids, search_ranked_ids
 
 class CollegeAdminForm(forms.ModelForm):
+    courses_offered = forms.CharField(
+        required=False,
+        help_text="Enter courses separated by commas (e.g., BTech, BSc, MBA)",
+        widget=forms.Textarea(attrs={'rows': 3, 'cols': 50, 'placeholder': 'BTech, BSc, MBA'})
+    )
+    facilities_offered = forms.CharField(
+        required=False,
+        help_text="Enter facilities separated by commas (e.g., Hostel, Library, Sports, Lab)",
+        widget=forms.Textarea(attrs={'rows': 3, 'cols': 50, 'placeholder': 'Hostel, Library, Sports, Lab'})
+    )
+
     class Meta:
         model = College
-        fields = '__all__'
+        exclude = ['courses', 'facilities']
         widgets = {
-            'courses_offered': forms.Textarea(attrs={'rows': 3, 'cols': 50, 'placeholder': 'BTech, BSc, MBA'}),
-            'facilities': forms.Textarea(attrs={'rows': 3, 'cols': 50, 'placeholder': 'Hostel, Library, Sports, Lab'}),
             'description': forms.Textarea(attrs={'rows': 4, 'cols': 50}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['courses_offered'] = ', '.join(self.instance.get_courses_list())
+            self.initial['facilities_offered'] = ', '.join(self.instance.get_facilities_list())
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        self.instance.set_courses(split_list(self.cleaned_data['courses_offered']))
+        self.instance.set_facilities(split_list(self.cleaned_data['facilities_offered']))
+
+class StudentAdminForm(forms.ModelForm):
+    preferred_courses = forms.CharField(
+        required=False,
+        help_text="Enter preferred courses separated by commas"
+    )
+
+    class Meta:
+        model = Student
+        exclude = ['courses']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['preferred_courses'] = ', '.join(self.instance.get_preferred_courses_list())
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        self.instance.set_preferred_courses(split_list(self.cleaned_data['preferred_courses']))
+
 @admin.register(College)
 class CollegeAdmin(admin.ModelAdmin):
     form = CollegeAdminForm
     list_display = ['name', 'location', 'display_courses', 'annual_fees', 'placement_rate', 'review_score']
     list_filter = ['location']
     search_fields = ['name', 'location']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('course_links__course')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Through the search index rather than icontains scans of search_fields.
+        if not search_term.strip():
+            return queryset, False
+        # The list filters are already applied to queryset.
+        return filter_ids(queryset, search_ranked_ids(queryset, search_term)), False
     
     fieldsets = (
         ('Basic Information', {
@@ -28,7 +78,7 @@ class CollegeAdmin(admin.ModelAdmin):
             'description': 'Enter courses separated by commas (e.g., BTech, BSc, MBA)'
         }),
         ('Facilities', {
-            'fields': ('facilities',),
+            'fields': ('facilities_offered',),
             'description': 'Enter facilities separated by commas (e.g., Hostel, Library, Sports, Lab)'
         }),
         ('Cut-off Marks', {
@@ -48,10 +98,14 @@ class CollegeAdmin(admin.ModelAdmin):
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
+    form = StudentAdminForm
     list_display = ['name', 'email', 'marks', 'category', 'display_preferred_courses', 'preferred_location', 'budget']
     list_filter = ['category', 'preferred_location']
     search_fields = ['name', 'email', 'user__username']
     raw_id_fields = ['user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('course_links__course')
     
     fieldsets = (
         ('User Information', {
@@ -83,3 +137,20 @@ class CollegeRatingAdmin(admin.ModelAdmin):
     list_display = ['college', 'user', 'rating', 'updated_at']
     list_filter = ['rating', 'updated_at']
     search_fields = ['college__name', 'user__username', 'user__email']
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+@admin.register(Facility)
+class FacilityAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+@admin.register(RecommendationJob)
+class RecommendationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'name', 'email']
+    readonly_fields = ['key', 'params', 'result', 'error', 'created_at', 'started_at', 'finished_at']
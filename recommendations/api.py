@@ -0,0 +1,134 @@
+"""JSON API (``/api/v1/``) for college search, recommendations and saved colleges.
+
+Lists use cursor pagination, every serializer honours ``?fields=``, and GET
+responses carry a content ETag so unchanged pages come back as 304.
+"""
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response, set_response_etag
+from rest_framework import generics
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import College, CollegeCourse, CollegeFacility, Ranking, Student
+from .serializers import (
+    CollegeSerializer,
+    RankingSerializer,
+    RecommendationQuerySerializer,
+    RecommendationSerializer,
+    requested_fields,
+)
+from .views import COLLEGE_LIST_PAGE_SIZE, MAX_PAGE_SIZE, apply_college_filters, prepare_recommendation_context
+
+
+class ConditionalGetMixin:
+    """Tag successful GET responses with an ETag and honour If-None-Match"""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            response.render()
+            set_response_etag(response)
+            response = get_conditional_response(request, etag=response['ETag'], response=response)
+        return response
+
+
+class CollegeCursorPagination(CursorPagination):
+    ordering = ('-display_rating', 'id')
+    page_size = COLLEGE_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class SavedCollegeCursorPagination(CollegeCursorPagination):
+    ordering = ('-total_score', '-created_at')
+
+
+def college_queryset(request):
+    """Colleges with only the link tables the requested fields read"""
+    fields = requested_fields(request)
+    colleges = College.objects.all()
+    if not fields or 'courses_offered' in fields:
+        colleges = colleges.prefetch_related(
+            Prefetch('course_links', queryset=CollegeCourse.objects.select_related('course'))
+        )
+    if not fields or 'facilities' in fields:
+        colleges = colleges.prefetch_related(
+            Prefetch('facility_links', queryset=CollegeFacility.objects.select_related('facility'))
+        )
+    return colleges
+
+
+class CollegeListView(ConditionalGetMixin, generics.ListAPIView):
+    """College search with the same filters as the college list page"""
+    serializer_class = CollegeSerializer
+    pagination_class = CollegeCursorPagination
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        params = self.request.query_params
+        return apply_college_filters(
+            college_queryset(self.request),
+            search=params.get('search'),
+            location=params.get('location'),
+            course=params.get('course'),
+            fees=params.get('fees'),
+            min_rating=params.get('min_rating')
+        )
+
+
+class CollegeDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    serializer_class = CollegeSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        return college_queryset(self.request)
+
+
+class RecommendationView(ConditionalGetMixin, APIView):
+    """Top matches for the query parameters or the student's saved preferences"""
+
+    def get(self, request, *args, **kwargs):
+        query = RecommendationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        student = Student.objects.filter(user=request.user).prefetch_related('course_links__course').first()
+        params = {}
+        if student:
+            params = {
+                'marks': student.marks,
+                'category': student.category,
+                'courses': student.get_preferred_courses_list(),
+                'location': student.preferred_location,
+                'budget': student.budget,
+                'min_rating': student.min_rating,
+            }
+        params.update(query.validated_data)
+
+        context = prepare_recommendation_context(
+            name=student.name if student else request.user.get_full_name(),
+            email=student.email if student else request.user.email,
+            marks=params.get('marks', 0),
+            category=params.get('category', 'General'),
+            preferred_courses=params.get('courses', []),
+            preferred_location=params.get('location', ''),
+            budget=params.get('budget', 0),
+            min_rating=params.get('min_rating', 0),
+            limit=params['limit'],
+            strategy=params.get('strategy')
+        )
+        serializer = RecommendationSerializer(
+            context['recommendations'],
+            many=True,
+            context={'request': request}
+        )
+        return Response({'results': serializer.data})
+
+
+class SavedCollegeListView(ConditionalGetMixin, generics.ListAPIView):
+    serializer_class = RankingSerializer
+    pagination_class = SavedCollegeCursorPagination
+
+    def get_queryset(self):
+        return Ranking.objects.filter(student__user=self.request.user).select_related('college')
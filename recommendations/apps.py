@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class RecommendationsConfig(AppConfig):
     name = 'recommendations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .result_cache import check_shared_caches
+
+        # Versions in a process-local cache leave other workers' snapshots stale.
+        check_shared_caches()
@@ -0,0 +1,197 @@
+"""Async versions of the read-heavy pages, used when served through asgi.py.
+
+Queries go through the async ORM and the ranking itself (NumPy scoring over
+the whole catalog) runs on a bounded thread pool, so neither blocks the event
+loop. Templates are rendered with ``sync_to_async`` because the context
+processors read the session and user synchronously. ``urls.py`` routes to
+these views when ``ASYNC_VIEWS`` is on.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from . import catalog_snapshot, facets, fragments, jobs, result_cache
+from .models import CollegeRating
+from .search import search_ranked_ids
+from .views import (
+    apply_college_filters,
+    build_recommendation_context,
+    compare_cache_key,
+    compare_context,
+    compare_ids,
+    get_colleges_with_rating_data,
+    get_page_size,
+    recommendation_params,
+)
+
+_scoring_executor = None
+
+
+def get_scoring_executor():
+    """Thread pool for ranking, sized by ``SCORING_EXECUTOR_WORKERS``"""
+    global _scoring_executor
+    if _scoring_executor is None:
+        workers = getattr(settings, 'SCORING_EXECUTOR_WORKERS', None) or min(4, os.cpu_count() or 1)
+        _scoring_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+    return _scoring_executor
+
+
+async def arender(request, template_name, context=None):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def aprepare_recommendation_context(
+    name,
+    email,
+    marks,
+    category,
+    preferred_courses,
+    preferred_location,
+    budget,
+    min_rating,
+    limit=10,
+    strategy=None
+):
+    params = recommendation_params(
+        marks, category, preferred_courses, preferred_location, budget, min_rating, limit, strategy
+    )
+
+    async def rank():
+        # One thread hop for the catalog (re)build rather than one per query.
+        catalog = await sync_to_async(catalog_snapshot.get_catalog)()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_scoring_executor(), partial(catalog.rank, **params))
+
+    ranked = await result_cache.aget_or_rank(params, rank)
+    college_map = await get_colleges_with_rating_data().ain_bulk([college_id for college_id, _ in ranked])
+    return build_recommendation_context(name, email, params, ranked, college_map)
+
+
+async def college_list(request):
+    search = request.GET.get('search')
+    colleges = apply_college_filters(
+        get_colleges_with_rating_data(),
+        location=request.GET.get('location'),
+        course=request.GET.get('course'),
+        fees=request.GET.get('fees'),
+        min_rating=request.GET.get('min_rating')
+    ).order_by('-display_rating', 'id')
+
+    if search:
+        # The index may need (re)building, which queries synchronously.
+        ranked_ids = await sync_to_async(search_ranked_ids)(colleges, search)
+        paginator = Paginator(ranked_ids, get_page_size(request))
+        page_obj = paginator.get_page(request.GET.get('page'))
+        college_map = await get_colleges_with_rating_data().ain_bulk(page_obj.object_list)
+        page_colleges = [college_map[college_id] for college_id in page_obj.object_list if college_id in college_map]
+    else:
+        paginator = Paginator(colleges, get_page_size(request))
+        # Paginator counts lazily and synchronously; fill in the count first.
+        paginator.count = await colleges.acount()
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_colleges = [college async for college in page_obj.object_list]
+
+    user = await request.auser()
+    if user.is_authenticated and page_colleges:
+        user_ratings = CollegeRating.objects.filter(
+            user=user,
+            college_id__in=[college.id for college in page_colleges]
+        ).values_list('college_id', 'rating')
+        user_rating_map = {college_id: rating async for college_id, rating in user_ratings}
+        for college in page_colleges:
+            college.user_rating = user_rating_map.get(college.id)
+
+    facet_data = await sync_to_async(facets.get_facets)()
+    context = {
+        'colleges': page_colleges,
+        'page_obj': page_obj,
+        'locations': [name for name, _ in facet_data['locations']],
+        'all_courses': [name for name, _ in facet_data['courses']],
+        **fragments.card_context(await fragments.aget_card_version())
+    }
+
+    return await arender(request, 'recommendations/college_list.html', context)
+
+
+@login_required
+async def college_detail(request, college_id):
+    college = await aget_object_or_404(get_colleges_with_rating_data(), id=college_id)
+    user = await request.auser()
+    user_rating = await CollegeRating.objects.filter(
+        college=college,
+        user=user
+    ).values_list('rating', flat=True).afirst()
+
+    context = {
+        'college': college,
+        'user_rating': user_rating
+    }
+    return await arender(request, 'recommendations/college_detail.html', context)
+
+
+async def compare_colleges(request):
+    college_ids = compare_ids(request.GET)
+    college_map = {}
+    if college_ids:
+        cache = result_cache.get_result_cache()
+        key = compare_cache_key(college_ids, await result_cache.aget_catalog_version())
+        college_map = await cache.aget(key)
+        if college_map is None:
+            college_map = await get_colleges_with_rating_data().ain_bulk(college_ids)
+            await cache.aset(key, college_map)
+    context = compare_context(college_ids, college_map)
+    return await arender(request, 'recommendations/compare_colleges.html', context)
+
+
+@login_required
+async def generate_recommendations(request):
+    if request.method == 'POST':
+        name = request.POST.get('studentName')
+        email = request.POST.get('studentEmail')
+        marks = float(request.POST.get('marks', 0))
+        category = request.POST.get('category', 'General')
+        preferred_course = request.POST.get('preferred_course', '')
+        preferred_location = request.POST.get('preferred_location', '')
+        budget = float(request.POST.get('budget', 0)) if request.POST.get('budget') else 0
+        min_rating = float(request.POST.get('min_rating', 0))
+
+        await request.session.aset('student_data', {
+            'name': name,
+            'email': email,
+            'marks': marks,
+            'category': category,
+            'preferred_course': preferred_course,
+            'preferred_location': preferred_location,
+            'budget': budget,
+            'min_rating': min_rating
+        })
+
+        inputs = {
+            'marks': marks,
+            'category': category,
+            'preferred_courses': [preferred_course] if preferred_course else [],
+            'preferred_location': preferred_location,
+            'budget': budget,
+            'min_rating': min_rating
+        }
+        if jobs.enabled():
+            user = await request.auser()
+            job = await sync_to_async(jobs.enqueue)(user, name, email, recommendation_params(**inputs))
+            return redirect('recommendation_job', job_id=job.pk)
+
+        context = await aprepare_recommendation_context(name=name, email=email, **inputs)
+        return await arender(request, 'recommendations/results.html', context)
+
+    facet_data = await sync_to_async(facets.get_facets)()
+    context = {
+        'all_courses': [name for name, _ in facet_data['courses']],
+        'locations': [name for name, _ in facet_data['locations']]
+    }
+    return await arender(request, 'recommendations/generate_recommendations.html', context)
@@ -0,0 +1,48 @@
+"""Ranking helpers for the ``recommend_all`` command's worker processes.
+
+This module must not import Django models: spawned workers receive a pickled
+``CollegeCatalog`` and plain student tuples, and never touch the database.
+"""
+_worker_catalog = None
+_worker_strategy = None
+
+
+def student_profile(student):
+    """Plain tuple of the preferences used to rank colleges for a student"""
+    return (
+        student.pk,
+        student.marks or 0,
+        student.category or 'General',
+        student.get_preferred_courses_list(),
+        student.preferred_location or '',
+        student.budget or 0,
+        student.min_rating or 0,
+    )
+
+
+def rank_profiles(catalog, profiles, limit, strategy):
+    """Return ``(student_id, college_id, score)`` for each student's top colleges"""
+    results = []
+    for student_id, marks, category, courses, location, budget, min_rating in profiles:
+        ranked = catalog.rank(
+            marks=marks,
+            category=category,
+            preferred_courses=courses,
+            preferred_location=location,
+            budget=budget,
+            min_rating=min_rating,
+            limit=limit,
+            strategy=strategy
+        )
+        results.extend((student_id, college_id, score) for college_id, score in ranked)
+    return results
+
+
+def init_worker(catalog, strategy):
+    global _worker_catalog, _worker_strategy
+    _worker_catalog = catalog
+    _worker_strategy = strategy
+
+
+def rank_in_worker(profiles, limit):
+    return rank_profiles(_worker_catalog, profiles, limit, _worker_strategy)
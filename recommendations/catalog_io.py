@@ -0,0 +1,317 @@
+"""Streaming CSV/JSONL import and export of the college catalog.
+
+Rows are read one at a time and written in batches: each batch is validated,
+upserted on the ``(name, location)`` natural key with a single
+``bulk_create(update_conflicts=True)`` per column set, and committed in its
+own transaction. Bulk writes skip the model signals, so caches, the catalog
+snapshot, the search index and saved rankings are invalidated once per batch
+through ``signals.college_rows_changed``.
+
+Only the columns present in a row are written: a file with just ``name``,
+``location`` and the cutoffs updates the cutoffs of existing colleges and
+leaves everything else alone. ``courses`` and ``facilities`` are
+comma-separated in CSV and lists (or comma-separated strings) in JSONL; when
+present they replace the college's list.
+"""
+import csv
+import json
+import math
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import signals
+from .models import (
+    College,
+    CollegeCourse,
+    CollegeFacility,
+    Course,
+    Facility,
+    display_rating_expression,
+    replace_links,
+    split_list,
+)
+
+FORMATS = ('csv', 'jsonl')
+NATURAL_KEY = ('name', 'location')
+FIELD_COLUMNS = (
+    'name', 'location', 'description', 'annual_fees', 'cutoff_general', 'cutoff_obc', 'cutoff_sc', 'cutoff_st',
+    'placement_rate', 'avg_package', 'review_score'
+)
+# Link column -> (link model, tag model)
+LINK_COLUMNS = {
+    'courses': (CollegeCourse, Course),
+    'facilities': (CollegeFacility, Facility),
+}
+COLUMNS = FIELD_COLUMNS + tuple(LINK_COLUMNS)
+DEFAULT_BATCH_SIZE = 1000
+
+
+def detect_format(path, format=None):
+    """The explicit ``format``, or the one implied by ``path``'s extension"""
+    if format:
+        return format
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise ValueError(f'Cannot tell the format of {path!r}; pass --format ({", ".join(FORMATS)})')
+
+
+def read_rows(stream, format):
+    """Yield ``(line number, row, error)`` for each record in ``stream``.
+
+    ``row`` is a dict of column values, or the raw text when the record could
+    not be parsed (``error`` says why). Unknown CSV columns raise ValueError
+    before any row is read.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        unknown = [column for column in reader.fieldnames or () if column not in COLUMNS]
+        if unknown:
+            raise ValueError(f'Unknown columns: {", ".join(unknown)}')
+        missing = [column for column in NATURAL_KEY if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f'Missing columns: {", ".join(missing)}')
+        for row in reader:
+            if None in row:
+                yield reader.line_num, row, 'More values than columns'
+            else:
+                yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, line.rstrip('\n'), f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, line.rstrip('\n'), 'Expected a JSON object'
+        else:
+            yield line_number, row, None
+
+
+def clean_row(row):
+    """Model values and link names for one row; raises ValidationError"""
+    unknown = [column for column in row if column not in COLUMNS]
+    if unknown:
+        raise ValidationError(f'Unknown columns: {", ".join(map(str, unknown))}')
+    values = {}
+    links = {}
+    errors = {}
+    for column, value in row.items():
+        if column in LINK_COLUMNS:
+            if isinstance(value, list) and all(isinstance(name, str) for name in value):
+                links[column] = [name.strip() for name in value if name.strip()]
+            elif isinstance(value, str) or value is None:
+                links[column] = split_list(value)
+            else:
+                errors[column] = ['Expected a list of names or a comma-separated string']
+            continue
+        field = College._meta.get_field(column)
+        if isinstance(value, str) and column != 'description':
+            value = value.strip()
+        try:
+            value = field.clean(value, None)
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValidationError('Enter a finite number.')
+        except ValidationError as e:
+            errors[column] = e.messages
+        else:
+            values[column] = value
+    for column in NATURAL_KEY:
+        if column not in row:
+            errors[column] = ['This field is required.']
+    if errors:
+        raise ValidationError(errors)
+    return values, links
+
+
+def format_error(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f'{column}: {" ".join(messages)}' for column, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+class ErrorWriter:
+    """Writes rejected rows to ``path`` in the input format, opening it on the first one"""
+
+    def __init__(self, path, format):
+        self.path = path
+        self.format = format
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def __call__(self, line_number, row, error):
+        if self._file is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            if self.format == 'csv':
+                self._writer = csv.DictWriter(self._file, ['line', 'error', *COLUMNS], extrasaction='ignore')
+                self._writer.writeheader()
+        if self.format == 'csv':
+            values = row if isinstance(row, dict) else {}
+            self._writer.writerow(dict(values, line=line_number, error=error))
+        else:
+            self._file.write(json.dumps({'line': line_number, 'error': error, 'row': row}, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def import_colleges(records, batch_size=DEFAULT_BATCH_SIZE, on_error=None, on_batch=None):
+    """Upsert the colleges in ``records`` (from ``read_rows``), one transaction per batch.
+
+    ``on_error(line_number, row, message)`` receives each rejected row and
+    ``on_batch(counts)`` the running totals after each committed batch.
+    Returns ``{'read', 'created', 'updated', 'unchanged', 'failed'}`` counts.
+    """
+    counts = {'read': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+
+    def reject(line_number, row, message):
+        counts['failed'] += 1
+        if on_error is not None:
+            on_error(line_number, row, message)
+
+    batch = {}
+    for line_number, row, error in records:
+        counts['read'] += 1
+        if error is None:
+            try:
+                values, links = clean_row(row)
+            except ValidationError as e:
+                error = format_error(e)
+        if error is not None:
+            reject(line_number, row, error)
+            continue
+        # A later row for the same college replaces an earlier one.
+        batch.pop((values['name'], values['location']), None)
+        batch[values['name'], values['location']] = (values, links)
+        if len(batch) >= batch_size:
+            _write_batch(batch, counts)
+            batch = {}
+            if on_batch is not None:
+                on_batch(counts)
+    if batch:
+        _write_batch(batch, counts)
+        if on_batch is not None:
+            on_batch(counts)
+    return counts
+
+
+def linked_names_by_college(college_ids):
+    """``{link column: {college_id: [names]}}`` for ``college_ids``, one query per column"""
+    names = {}
+    for column, (link_model, tag_model) in LINK_COLUMNS.items():
+        names[column] = defaultdict(list)
+        links = link_model.objects.filter(college_id__in=college_ids).order_by('college_id', 'position')
+        for college_id, name in links.values_list('college_id', f'{tag_model._meta.model_name}__name'):
+            names[column][college_id].append(name)
+    return names
+
+
+def _write_batch(batch, counts):
+    with transaction.atomic():
+        existing = {
+            (row[1], row[2]): (row[0], dict(zip(FIELD_COLUMNS, row[1:])))
+            for row in College.objects.filter(name__in={name for name, _ in batch}).values_list('pk', *FIELD_COLUMNS)
+        }
+        current_links = linked_names_by_college([college_id for college_id, _ in existing.values()])
+
+        # Only rows that differ from what is stored are written and invalidated,
+        # so re-importing a mostly unchanged file is cheap.
+        changed = {}
+        for key, (values, links) in batch.items():
+            if key in existing:
+                college_id, stored = existing[key]
+                if all(stored[column] == value for column, value in values.items()) and all(
+                    current_links[column].get(college_id, []) == list(dict.fromkeys(names))
+                    for column, names in links.items()
+                ):
+                    counts['unchanged'] += 1
+                    continue
+            changed[key] = (values, links)
+
+        # Rows with the same columns share one upsert statement.
+        groups = defaultdict(list)
+        for key, (values, _) in changed.items():
+            groups[tuple(values)].append(key)
+
+        college_ids = {}
+        rescored_ids = []
+        for columns, keys in groups.items():
+            colleges = []
+            for key in keys:
+                values = changed[key][0]
+                # New rows start unrated; existing rows get it recomputed below.
+                colleges.append(College(display_rating=values.get('review_score', 0), **values))
+            update_fields = [column for column in columns if column not in NATURAL_KEY] + ['updated_at']
+            College.objects.bulk_create(
+                colleges, update_conflicts=True, unique_fields=NATURAL_KEY, update_fields=update_fields
+            )
+            for key, college in zip(keys, colleges):
+                # Backends that cannot return ids from an upsert leave new rows without one.
+                college_ids[key] = college.pk
+            if 'review_score' in columns:
+                rescored_ids.extend(college.pk for college, key in zip(colleges, keys) if key in existing)
+        if None in college_ids.values():
+            saved = College.objects.filter(name__in={name for name, _ in changed}).values_list('name', 'location', 'pk')
+            college_ids.update({(name, location): pk for name, location, pk in saved if (name, location) in changed})
+
+        if rescored_ids:
+            College.objects.filter(pk__in=rescored_ids).update(display_rating=display_rating_expression())
+        for column, (link_model, tag_model) in LINK_COLUMNS.items():
+            assignments = {
+                college_ids[key]: links[column] for key, (_, links) in changed.items()
+                if column in links and current_links[column].get(college_ids[key], []) != list(dict.fromkeys(links[column]))
+            }
+            if assignments:
+                replace_links(link_model, 'college', tag_model, assignments, notify=False)
+        if college_ids:
+            signals.college_rows_changed(college_ids.values())
+
+    created = len(changed.keys() - existing.keys())
+    counts['created'] += created
+    counts['updated'] += len(changed) - created
+
+
+def export_rows(colleges=None, chunk_size=DEFAULT_BATCH_SIZE):
+    """Yield a dict of ``COLUMNS`` per college, reading ``chunk_size`` colleges at a time"""
+    if colleges is None:
+        colleges = College.objects.all()
+    last_id = 0
+    while True:
+        # Keyset pagination: each chunk is a short query, no cursor held open.
+        rows = list(colleges.filter(pk__gt=last_id).order_by('pk').values_list('pk', *FIELD_COLUMNS)[:chunk_size])
+        if not rows:
+            return
+        college_ids = [row[0] for row in rows]
+        names = linked_names_by_college(college_ids)
+        for college_id, *values in rows:
+            row = dict(zip(FIELD_COLUMNS, values))
+            for column in LINK_COLUMNS:
+                row[column] = names[column].get(college_id, [])
+            yield row
+        last_id = college_ids[-1]
+
+
+def write_rows(stream, rows, format):
+    """Write ``rows`` from ``export_rows`` to ``stream``; returns how many were written"""
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(stream, COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, **{column: ', '.join(row[column]) for column in LINK_COLUMNS}))
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,52 @@
+"""A process-wide ``CollegeCatalog`` of every college, reused between requests.
+
+Ranking used to read the whole college table on every result cache miss. The
+snapshot is built once per catalog version (see ``result_cache``) instead.
+When this process changes a college, its ratings or its links, the signal
+handlers in ``signals.py`` bump the version after the transaction commits,
+re-read just those colleges and patch them in, moving the snapshot to the
+new version. Changes made by other processes show up as a version the snapshot
+has not seen, and the next request rebuilds it (see ``snapshots``).
+"""
+from django.db import transaction
+
+from .models import College
+from .result_cache import bump_catalog_version, get_catalog_version
+from .scoring import CollegeCatalog
+from .snapshots import VersionedSnapshot
+
+
+def build_catalog():
+    return CollegeCatalog.from_queryset(College.objects.all())
+
+
+snapshot = VersionedSnapshot(get_catalog_version, build_catalog)
+
+
+def get_catalog():
+    """The catalog of all colleges at the current catalog version"""
+    return snapshot.get()
+
+
+def colleges_changed(college_ids):
+    """Bump the catalog version and patch ``college_ids`` in once the current transaction commits.
+
+    Bumping earlier would let a concurrent request read the new version
+    together with the old rows, and cache a ranking under it that nothing
+    invalidates.
+    """
+    college_ids = list(college_ids)
+    transaction.on_commit(lambda: _patch(college_ids, bump_catalog_version()))
+
+
+def _patch(college_ids, version):
+    def update(catalog):
+        changed = CollegeCatalog.from_queryset(College.objects.filter(pk__in=college_ids))
+        removed = sorted(set(college_ids) - set(changed.ids.tolist()))
+        return catalog.patched(changed, removed)
+
+    snapshot.patch(version, update)
+
+
+def clear():
+    snapshot.clear()
@@ -0,0 +1,61 @@
+"""Cached location and course vocabularies for the filter dropdowns.
+
+The facets are computed with two aggregate queries and stored in Django's
+cache framework (the ``default`` alias unless ``FACET_CACHE_ALIAS`` says
+otherwise). Signal handlers in ``signals.py`` drop the entry whenever
+colleges or their course links change.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from .models import College, Course
+
+FACET_CACHE_KEY = 'recommendations:facets'
+
+
+def get_facet_cache():
+    return caches[getattr(settings, 'FACET_CACHE_ALIAS', 'default')]
+
+
+def build_facets():
+    """Compute ``{'locations': [(name, count)], 'courses': [(name, count)]}``"""
+    locations = (
+        College.objects.exclude(location='')
+        .values_list('location')
+        .annotate(college_count=Count('id'))
+        .order_by('location')
+    )
+    courses = (
+        Course.objects.annotate(college_count=Count('college_links'))
+        .filter(college_count__gt=0)
+        .order_by('name')
+        .values_list('name', 'college_count')
+    )
+    return {
+        'locations': list(locations),
+        'courses': list(courses),
+    }
+
+
+def get_facets():
+    facet_cache = get_facet_cache()
+    facets = facet_cache.get(FACET_CACHE_KEY)
+    if facets is None:
+        facets = build_facets()
+        facet_cache.set(FACET_CACHE_KEY, facets, getattr(settings, 'FACET_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def get_locations():
+    """Sorted distinct, non-empty college locations"""
+    return [name for name, _ in get_facets()['locations']]
+
+
+def get_courses():
+    """Sorted names of courses offered by at least one college"""
+    return [name for name, _ in get_facets()['courses']]
+
+
+def invalidate_facets():
+    get_facet_cache().delete(FACET_CACHE_KEY)
@@ -0,0 +1,40 @@
+"""Cached college card fragments of ``college_list.html``.
+
+A card is cached under its college's id, ``updated_at`` and rating
+aggregates, so a save, a course/facility change (which touches
+``updated_at``, see ``signals.py``) or a new rating renders only that card
+again. Renaming a Course or Facility changes cards of many colleges at once
+and moves ``CARD_VERSION_KEY`` on instead. The parts that depend on the
+user (their own rating) are left outside the cached fragments.
+
+Fragments go to the ``template_fragments`` cache alias when it is
+configured, and to ``default`` otherwise.
+"""
+from django.conf import settings
+
+from .result_cache import aget_version, bump_version, get_version
+
+CARD_VERSION_KEY = 'recommendations:card-version'
+# Seconds a rendered card is kept; unchanged colleges keep hitting it.
+DEFAULT_CARD_TIMEOUT = 3600
+
+
+def get_card_timeout():
+    return getattr(settings, 'COLLEGE_CARD_CACHE_TIMEOUT', DEFAULT_CARD_TIMEOUT)
+
+
+def get_card_version():
+    return get_version(CARD_VERSION_KEY)
+
+
+async def aget_card_version():
+    return await aget_version(CARD_VERSION_KEY)
+
+
+def bump_card_version():
+    return bump_version(CARD_VERSION_KEY)
+
+
+def card_context(version):
+    """Template context the cached card fragments are keyed on"""
+    return {'card_timeout': get_card_timeout(), 'card_version': version}
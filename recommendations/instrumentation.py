@@ -0,0 +1,268 @@
+"""Per-request latency and query instrumentation.
+
+``InstrumentationMiddleware`` counts and times every query a request runs,
+through an execute wrapper installed on each database connection, then:
+
+* adds a ``Server-Timing`` header (total, db and app time, query count),
+* folds the numbers into per-view totals in ``registry``, which the
+  ``metrics`` view serves in the Prometheus text format,
+* logs requests slower than ``SLOW_REQUEST_MS`` with their slowest SQL and
+  repeated query signatures.
+
+The per-query cost is a clock read and a dict update; statements are only
+normalized once per request, for the handful of distinct ones. Totals are kept
+per process, so scrape every worker.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Seconds; upper bounds of the request latency histogram.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOWEST_QUERIES = 3
+
+# "IN (%s, %s, %s)" and the like, so batches of different sizes share a signature.
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def query_signature(sql):
+    return _PLACEHOLDER_LIST.sub('(%s, ...)', sql)
+
+
+def _call_key(sql, params):
+    try:
+        key = (sql, tuple(params) if isinstance(params, list) else params)
+        hash(key)
+    except TypeError:
+        key = (sql, repr(params))
+    return key
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable recording the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # (sql, params) -> [executions, total seconds]
+        self.calls = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            key = _call_key(sql, None if many else params)
+            stats = self.calls.get(key)
+            if stats is None:
+                self.calls[key] = [1, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+
+    @property
+    def duplicates(self):
+        """Executions repeating an earlier query with the same parameters"""
+        return sum(executions - 1 for executions, _ in self.calls.values())
+
+    def signatures(self):
+        """``{signature: [executions, total seconds]}`` over all queries"""
+        grouped = {}
+        for (sql, _), (executions, duration) in self.calls.items():
+            stats = grouped.setdefault(query_signature(sql), [0, 0.0])
+            stats[0] += executions
+            stats[1] += duration
+        return grouped
+
+    def repeated_signatures(self):
+        """Signatures executed more than once (N+1 candidates), most frequent first"""
+        repeated = [(sql, stats[0]) for sql, stats in self.signatures().items() if stats[0] > 1]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def slowest(self, count=SLOWEST_QUERIES):
+        """``(seconds, sql)`` of the slowest single executions"""
+        slowest = heapq.nlargest(
+            count,
+            ((duration / executions, sql) for (sql, _), (executions, duration) in self.calls.items())
+        )
+        return [(seconds, query_signature(sql)) for seconds, sql in slowest]
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Per-view request totals and latency histogram for this process"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, duration, db_duration, queries, duplicates, slow=False):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = {
+                    'buckets': [0] * len(self.buckets),
+                    'count': 0,
+                    'duration': 0.0,
+                    'db_duration': 0.0,
+                    'queries': 0,
+                    'duplicates': 0,
+                    'slow': 0,
+                }
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    stats['buckets'][index] += 1
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['db_duration'] += db_duration
+            stats['queries'] += queries
+            stats['duplicates'] += duplicates
+            stats['slow'] += slow
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(stats, buckets=list(stats['buckets'])) for view, stats in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """The totals in the Prometheus text exposition format"""
+        views = sorted(self.snapshot().items())
+        lines = [
+            '# HELP recommendations_request_duration_seconds Request wall time by view.',
+            '# TYPE recommendations_request_duration_seconds histogram',
+        ]
+        for view, stats in views:
+            label = f'view="{_label(view)}"'
+            for bound, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'recommendations_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'recommendations_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+            lines.append(f'recommendations_request_duration_seconds_sum{{{label}}} {stats["duration"]:.6f}')
+            lines.append(f'recommendations_request_duration_seconds_count{{{label}}} {stats["count"]}')
+
+        counters = [
+            ('db_duration_seconds_total', 'db_duration', 'Time spent in database queries by view.'),
+            ('db_queries_total', 'queries', 'Database queries by view.'),
+            ('db_duplicate_queries_total', 'duplicates', 'Queries repeated with identical parameters by view.'),
+            ('slow_requests_total', 'slow', 'Requests slower than SLOW_REQUEST_MS by view.'),
+        ]
+        for name, field, help_text in counters:
+            lines.append(f'# HELP recommendations_{name} {help_text}')
+            lines.append(f'# TYPE recommendations_{name} counter')
+            for view, stats in views:
+                value = stats[field]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'recommendations_{name}{{view="{_label(view)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# The recorder of the request being handled. Context variables follow the
+# request into sync_to_async threads, where async views run their queries on
+# that thread's own connection, so every connection routes through
+# record_query rather than the request wrapping a single one.
+_current_recorder = ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class InstrumentationMiddleware:
+    """Time each request and its queries; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+        self.slow_threshold = getattr(settings, 'SLOW_REQUEST_MS', 500) / 1000
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # This thread's connection may predate the connection_created receiver.
+        install_query_recorder(connection)
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    def finish(self, request, response, recorder, duration):
+        view = view_name(request)
+        slow = duration >= self.slow_threshold
+        registry.observe(view, duration, recorder.duration, recorder.count, recorder.duplicates, slow)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+                f'app;dur={(duration - recorder.duration) * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+        if slow:
+            self.log_slow_request(request, view, duration, recorder)
+        return response
+
+    def log_slow_request(self, request, view, duration, recorder):
+        slowest = ''.join(f'\n  {seconds * 1000:.1f} ms: {sql}' for seconds, sql in recorder.slowest())
+        repeated = ''.join(f'\n  {count}x: {sql}' for sql, count in recorder.repeated_signatures()[:SLOWEST_QUERIES])
+        logger.warning(
+            'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, %d duplicates'
+            '\nSlowest queries:%s\nRepeated queries:%s',
+            request.method, request.path, view, duration * 1000, recorder.count, recorder.duration * 1000,
+            recorder.duplicates, slowest or ' none', repeated or ' none'
+        )
@@ -0,0 +1,291 @@
+"""Recommendation rankings run outside the request, for when scoring is slow.
+
+With ``RECOMMENDATION_JOB_RUNNER`` set, ``generate_recommendations`` and
+``save_dashboard_preferences`` store a ``RecommendationJob`` and redirect to
+its page, which polls ``recommendation_job_status`` until the ranking is
+done. Because the job row lives in the database, any worker can serve the
+poll. Runners:
+
+* ``ThreadRunner`` ranks on a pool of ``RECOMMENDATION_JOB_WORKERS``
+  threads in the web process.
+* ``DatabaseRunner`` leaves the rows queued for the
+  ``run_recommendation_jobs`` command. Run as many of those as you want
+  rankings in parallel.
+
+A submission identical to a queued or running job of the same user (same
+inputs, same name and email) gets that job back instead of a new one; a
+partial unique constraint on ``key`` enforces this across processes. Wait
+and run times are recorded in ``metrics`` and rendered at ``/metrics/``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import catalog_snapshot, result_cache
+from .instrumentation import LATENCY_BUCKETS
+from .models import RecommendationJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds a job may stay queued or running before it no longer blocks a new
+# identical submission and is reported as failed.
+DEFAULT_JOB_TIMEOUT = 300
+# Seconds finished jobs are kept for polling before purge_finished_jobs drops them.
+DEFAULT_JOB_RETENTION = 3600
+
+
+def job_key(user, name, email, params):
+    payload = json.dumps([user.pk, name or '', email or '', result_cache.fingerprint(**params)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class JobMetrics:
+    """Job counts and wait/run time histograms for this process"""
+
+    # timed_out: the job ran to the end, but expire_stale_jobs had failed it meanwhile.
+    OUTCOMES = ('enqueued', 'deduplicated', 'succeeded', 'failed', 'timed_out')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.OUTCOMES, 0)
+            self._timings = {
+                phase: {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+                for phase in ('wait', 'run')
+            }
+
+    def count(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def observe(self, wait, run, outcome='succeeded'):
+        with self._lock:
+            self._counts[outcome] += 1
+            for phase, seconds in (('wait', wait), ('run', run)):
+                stats = self._timings[phase]
+                for index, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        stats['buckets'][index] += 1
+                stats['count'] += 1
+                stats['sum'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counts': dict(self._counts),
+                'timings': {
+                    phase: dict(stats, buckets=list(stats['buckets'])) for phase, stats in self._timings.items()
+                },
+            }
+
+    def render(self, in_flight=None):
+        """Prometheus text; ``in_flight`` maps status to the number of jobs in it"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP recommendations_jobs_total Recommendation jobs by outcome.',
+            '# TYPE recommendations_jobs_total counter',
+        ]
+        for outcome, count in snapshot['counts'].items():
+            lines.append(f'recommendations_jobs_total{{outcome="{outcome}"}} {count}')
+        for phase, help_text in (('wait', 'Time jobs spent queued.'), ('run', 'Time jobs spent ranking.')):
+            name = f'recommendations_job_{phase}_seconds'
+            stats = snapshot['timings'][phase]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for bound, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {stats["count"]}')
+            lines.append(f'{name}_sum {stats["sum"]:.6f}')
+            lines.append(f'{name}_count {stats["count"]}')
+        if in_flight is not None:
+            lines.append('# HELP recommendations_jobs_in_flight Jobs queued or running, across all processes.')
+            lines.append('# TYPE recommendations_jobs_in_flight gauge')
+            for status in RecommendationJob.IN_FLIGHT:
+                lines.append(f'recommendations_jobs_in_flight{{status="{status}"}} {in_flight.get(status, 0)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = JobMetrics()
+
+
+def in_flight_counts():
+    """``{status: count}`` of queued and running jobs"""
+    return dict(
+        RecommendationJob.objects.filter(status__in=RecommendationJob.IN_FLIGHT)
+        .order_by()
+        .values_list('status')
+        .annotate(count=Count('id'))
+    )
+
+
+def get_job_timeout():
+    return getattr(settings, 'RECOMMENDATION_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+
+
+def expire_stale_jobs(**filters):
+    """Fail in-flight jobs older than ``RECOMMENDATION_JOB_TIMEOUT`` (e.g. left by a crashed worker)"""
+    cutoff = timezone.now() - timedelta(seconds=get_job_timeout())
+    return RecommendationJob.objects.filter(
+        status__in=RecommendationJob.IN_FLIGHT, created_at__lt=cutoff, **filters
+    ).update(status=RecommendationJob.FAILED, error='Timed out', finished_at=timezone.now())
+
+
+def purge_finished_jobs(retention=None):
+    """Delete jobs finished more than ``retention`` seconds ago"""
+    if retention is None:
+        retention = getattr(settings, 'RECOMMENDATION_JOB_RETENTION', DEFAULT_JOB_RETENTION)
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    deleted, _ = RecommendationJob.objects.filter(finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def enqueue(user, name, email, params):
+    """Return the job ranking ``params`` for ``user``: an identical in-flight one or a new one.
+
+    New jobs are handed to the runner once the current transaction commits.
+    """
+    key = job_key(user, name, email, params)
+    expire_stale_jobs(key=key)
+    job = RecommendationJob.objects.filter(key=key, status__in=RecommendationJob.IN_FLIGHT).first()
+    if job is not None:
+        metrics.count('deduplicated')
+        return job
+    try:
+        with transaction.atomic():
+            job = RecommendationJob.objects.create(user=user, key=key, name=name or '', email=email or '',
+                                                   params=params)
+    except IntegrityError:
+        # An identical job was created concurrently.
+        job = RecommendationJob.objects.filter(key=key, status__in=RecommendationJob.IN_FLIGHT).first()
+        if job is None:
+            raise
+        metrics.count('deduplicated')
+        return job
+    metrics.count('enqueued')
+    runner = get_runner()
+    transaction.on_commit(lambda: runner.submit(job.pk))
+    return job
+
+
+def run_job(job_id):
+    """Claim a queued job and rank it. Returns False if another worker got it first."""
+    claimed = RecommendationJob.objects.filter(pk=job_id, status=RecommendationJob.QUEUED).update(
+        status=RecommendationJob.RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+    job = RecommendationJob.objects.get(pk=job_id)
+    params = job.params
+    try:
+        ranked = result_cache.get_or_rank(params, lambda: catalog_snapshot.get_catalog().rank(**params))
+    except Exception as e:
+        logger.exception('Recommendation job %s failed', job_id)
+        job.status = RecommendationJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = RecommendationJob.DONE
+        job.result = [[college_id, score] for college_id, score in ranked]
+    job.finished_at = timezone.now()
+    # Only if still running: the job may have timed out meanwhile.
+    updated = RecommendationJob.objects.filter(pk=job.pk, status=RecommendationJob.RUNNING).update(
+        status=job.status, result=job.result, error=job.error, finished_at=job.finished_at
+    )
+    if not updated:
+        outcome = 'timed_out'
+    elif job.status == RecommendationJob.FAILED:
+        outcome = 'failed'
+    else:
+        outcome = 'succeeded'
+    metrics.observe(job.wait_time, job.run_time, outcome)
+    return True
+
+
+def claim_next():
+    """Run the oldest queued job, if any; returns whether one was run"""
+    for job_id in RecommendationJob.objects.filter(
+        status=RecommendationJob.QUEUED
+    ).order_by('created_at').values_list('pk', flat=True)[:10]:
+        if run_job(job_id):
+            return True
+    return False
+
+
+class ThreadRunner:
+    """Rank on a bounded pool of threads in this process.
+
+    There is no ``run_recommendation_jobs`` command alongside to clean up, so
+    after a job, at most every ``PURGE_INTERVAL`` seconds, stale jobs are
+    failed and finished ones past ``RECOMMENDATION_JOB_RETENTION`` deleted.
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        workers = getattr(settings, 'RECOMMENDATION_JOB_WORKERS', None) or min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recommendation-job')
+        self._purge_lock = threading.Lock()
+        self._last_purge = None
+
+    def submit(self, job_id):
+        self.executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        close_old_connections()
+        try:
+            run_job(job_id)
+            self.purge_if_due()
+        except Exception:
+            logger.exception('Recommendation job %s could not be run', job_id)
+        finally:
+            close_old_connections()
+
+    def purge_if_due(self):
+        """Expire and purge jobs unless that was done less than ``PURGE_INTERVAL`` seconds ago"""
+        with self._purge_lock:
+            now = time.monotonic()
+            if self._last_purge is not None and now - self._last_purge < self.PURGE_INTERVAL:
+                return False
+            self._last_purge = now
+        expire_stale_jobs()
+        purge_finished_jobs()
+        return True
+
+
+class DatabaseRunner:
+    """Leave jobs queued for the ``run_recommendation_jobs`` command"""
+
+    def submit(self, job_id):
+        pass
+
+
+_runner = None
+_runner_path = None
+
+
+def get_runner():
+    """The runner named by ``RECOMMENDATION_JOB_RUNNER``, or None when jobs are off"""
+    global _runner, _runner_path
+    path = getattr(settings, 'RECOMMENDATION_JOB_RUNNER', None)
+    if path != _runner_path:
+        _runner = import_string(path)() if path else None
+        _runner_path = path
+    return _runner
+
+
+def enabled():
+    return get_runner() is not None
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from recommendations.models import College, Student
+from recommendations.synthetic import COURSES, LOCATIONS, USERNAME_PREFIX
+
+from .bench_views import percentiles
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure throughput of the college list, detail, compare and recommendation pages under '
+        'concurrent requests. With ASYNC_VIEWS on (DJANGO_ASYNC_VIEWS=1, as asgi.py sets) requests '
+        'run concurrently on one event loop through the ASGI handler, otherwise on a pool of threads '
+        'through the WSGI handler, as a threaded WSGI server would. "reads and writes" mixes detail '
+        'views with ratings and saved colleges; server errors (e.g. "database is locked") are counted, '
+        'not raised. Needs data from seed_catalog.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--scenarios', nargs='+', metavar='NAME', help='Run only these scenarios')
+        parser.add_argument('--json', metavar='PATH', help='Also write the results to this file')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against results written by --json')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['results']
+
+        student = Student.objects.select_related('user').filter(
+            user__username__startswith=USERNAME_PREFIX
+        ).order_by('id').first()
+        college_ids = list(College.objects.values_list('id', flat=True))
+        if student is None or len(college_ids) < 2:
+            raise CommandError('No seeded students or colleges; run seed_catalog first')
+
+        mode = 'asgi' if settings.ASYNC_VIEWS else 'wsgi'
+        rng = random.Random(options['seed'])
+        requests = self._requests(rng, student, college_ids, options['requests'])
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - requests.keys()
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}; use {", ".join(requests)}')
+            requests = {name: requests[name] for name in options['scenarios']}
+        with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+            if mode == 'asgi':
+                results = asyncio.run(self._run_async(requests, student.user, options))
+            else:
+                results = self._run_threads(requests, student.user, options)
+
+        self.stdout.write(f"{mode} with {options['concurrency']} concurrent requests")
+        self.stdout.write(f"{'scenario':<18} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for name, result in results.items():
+            line = (
+                f"{name:<18} {result['rps']:>8.1f} {result['p50']:>9.2f} {result['p95']:>9.2f} "
+                f"{result['errors']:>7}"
+            )
+            previous = (baseline or {}).get(name)
+            if previous:
+                line += f"   {result['rps'] / previous['rps']:.2f}x req/s"
+            self.stdout.write(line)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'mode': mode,
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(f"Wrote {options['json']}")
+
+    def _requests(self, rng, student, college_ids, count):
+        """``{scenario: [(method, path, data)]}``, generated up front so both modes send the same requests"""
+        locations = [location for location, _ in LOCATIONS]
+        return {
+            'college list': [
+                ('get', reverse('college_list'), {'location': rng.choice(locations), 'course': rng.choice(COURSES)})
+                for _ in range(count)
+            ],
+            'college detail': [
+                ('get', reverse('college_detail', args=[rng.choice(college_ids)]), {})
+                for _ in range(count)
+            ],
+            'compare': [
+                ('get', reverse('compare_colleges'), {'ids': ','.join(map(str, rng.sample(college_ids, 2)))})
+                for _ in range(count)
+            ],
+            # Different marks each time, so most rankings miss the result cache.
+            'recommendations': [
+                ('post', reverse('generate_recommendations'), {
+                    'studentName': student.name,
+                    'studentEmail': student.email,
+                    'marks': round(rng.uniform(40, 100), 2),
+                    'category': student.category,
+                    'preferred_course': rng.choice(COURSES),
+                    'preferred_location': '',
+                    'budget': 0,
+                    'min_rating': 0,
+                })
+                for _ in range(count)
+            ],
+            # Mostly reads, with a rating or a saved college in two of five requests.
+            'reads and writes': [
+                rng.choice([
+                    ('get', reverse('college_detail', args=[college_id]), {}),
+                    ('get', reverse('college_detail', args=[college_id]), {}),
+                    ('get', reverse('college_detail', args=[college_id]), {}),
+                    ('post', reverse('rate_college', args=[college_id]), {'rating': rng.randint(1, 5)}),
+                    ('post', reverse('save_college'), {'college_id': college_id, 'score': rng.uniform(0, 10)}),
+                ])
+                for college_id in rng.choices(college_ids, k=count)
+            ],
+        }
+
+    def _summary(self, timings, elapsed):
+        result = percentiles([elapsed_ms for elapsed_ms, _ in timings])
+        result['rps'] = len(timings) / elapsed
+        result['errors'] = sum(status >= 500 for _, status in timings)
+        return result
+
+    @staticmethod
+    def _check(path, response):
+        if 400 <= response.status_code < 500:
+            raise CommandError(f'{path} failed with status {response.status_code}')
+        return response.status_code
+
+    def _run_threads(self, requests, user, options):
+        clients = []
+
+        def send(request):
+            method, path, data = request
+            client = clients.pop()
+            try:
+                start = time.perf_counter()
+                response = getattr(client, method)(path, data)
+                elapsed = (time.perf_counter() - start) * 1000
+            finally:
+                clients.append(client)
+            return elapsed, self._check(path, response)
+
+        for _ in range(options['concurrency']):
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            clients.append(client)
+
+        results = {}
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            for name, scenario in requests.items():
+                start = time.perf_counter()
+                timings = list(pool.map(send, scenario))
+                results[name] = self._summary(timings, time.perf_counter() - start)
+        for client in clients:
+            client.logout()
+        return results
+
+    async def _run_async(self, requests, user, options):
+        clients = []
+        for _ in range(options['concurrency']):
+            client = AsyncClient(raise_request_exception=False)
+            await client.aforce_login(user)
+            clients.append(client)
+
+        async def worker(client, queue, timings):
+            while queue:
+                method, path, data = queue.pop()
+                start = time.perf_counter()
+                response = await getattr(client, method)(path, data)
+                timings.append(((time.perf_counter() - start) * 1000, self._check(path, response)))
+
+        results = {}
+        for name, scenario in requests.items():
+            queue = list(reversed(scenario))
+            timings = []
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(client, queue, timings) for client in clients))
+            results[name] = self._summary(timings, time.perf_counter() - start)
+        for client in clients:
+            await client.alogout()
+        return results
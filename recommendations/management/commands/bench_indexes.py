@@ -0,0 +1,123 @@
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recommendations.models import College, Ranking, Student
+from recommendations.views import apply_college_filters
+
+from .bench_scoring import LOCATIONS, build_colleges
+
+User = get_user_model()
+
+# Created by migration 0006 on the user table, which has no model Meta here.
+USER_EMAIL_INDEX = 'user_email_idx'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query plans and timings of the college/ranking/login lookups with and without '
+        'the indexes from migration 0006. Runs on seeded data inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colleges', type=int, default=100000)
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--saved-per-student', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', metavar='PATH', help='Also write plans and timings to this file')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            start = time.perf_counter()
+            student_id, email = self._seed(rng, options)
+            self.stdout.write(f"Seeded {options['colleges']} colleges in {time.perf_counter() - start:.1f}s")
+
+            queries = {
+                'college list': lambda: College.objects.order_by('-display_rating', 'id')[:24],
+                'location filter': lambda: apply_college_filters(
+                    College.objects.all(), location=LOCATIONS[0].lower()
+                ).order_by('-display_rating', 'id')[:24],
+                'fee range': lambda: apply_college_filters(
+                    College.objects.all(), fees='100000-150000'
+                ).order_by('-display_rating', 'id')[:24],
+                'min rating': lambda: apply_college_filters(
+                    College.objects.all(), min_rating='4.5'
+                ).order_by('-display_rating', 'id')[:24],
+                'saved colleges': lambda: Ranking.objects.filter(student_id=student_id).order_by(
+                    '-total_score', '-created_at'
+                ),
+                'login by email': lambda: User.objects.filter(email=email),
+            }
+
+            after = self._measure(queries, options['repeat'])
+            self._drop_indexes()
+            before = self._measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'query':<16} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in queries:
+            self.stdout.write(
+                f"{name:<16} {before[name]['ms']:>10.3f} {after[name]['ms']:>10.3f} "
+                f"{before[name]['ms'] / after[name]['ms']:>7.1f}x"
+            )
+        if options['verbosity'] > 1:
+            for name in queries:
+                self.stdout.write(f"\n{name}\n  before: {before[name]['plan']}\n  after:  {after[name]['plan']}")
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'colleges': options['colleges'],
+                    'students': options['students'],
+                    'results': {name: {'before': before[name], 'after': after[name]} for name in queries},
+                }, f, indent=2)
+            self.stdout.write(f"Wrote {options['json']}")
+
+    def _seed(self, rng, options):
+        colleges = build_colleges(options['colleges'], options['seed'])
+        for college in colleges:
+            college.id = None
+        colleges = College.objects.bulk_create(colleges, batch_size=1000)
+
+        users = User.objects.bulk_create([
+            User(username=f'bench-{index}', email=f'bench-{index}@example.com')
+            for index in range(options['students'])
+        ], batch_size=1000)
+        students = Student.objects.bulk_create([
+            Student(user=user, name=user.username, email=user.email) for user in users
+        ], batch_size=1000)
+        Ranking.objects.bulk_create([
+            Ranking(student=student, college=college, total_score=round(rng.uniform(0, 10), 1))
+            for student in students
+            for college in rng.sample(colleges, min(options['saved_per_student'], len(colleges)))
+        ], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        sample = rng.choice(students)
+        return sample.pk, sample.email
+
+    def _drop_indexes(self):
+        names = [index.name for model in (College, Ranking) for index in model._meta.indexes]
+        with connection.cursor() as cursor:
+            for name in names + [USER_EMAIL_INDEX]:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+            cursor.execute('ANALYZE')
+
+    def _measure(self, queries, repeat):
+        results = {}
+        for name, build in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {'ms': min(timings), 'plan': build().explain()}
+        return results
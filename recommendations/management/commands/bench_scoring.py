@@ -0,0 +1,104 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations.models import College
+from recommendations.scoring import CollegeCatalog
+from recommendations.views import calculate_match_score
+
+LOCATIONS = ['Delhi', 'Mumbai', 'Pune', 'Bangalore', 'Chennai', 'Hyderabad', 'Kolkata', 'Jaipur']
+COURSES = ['BTech', 'BSc', 'MBA', 'BCA', 'MCA', 'BCom', 'MTech', 'BBA', 'LLB', 'MBBS']
+
+
+def build_colleges(size, seed):
+    rng = random.Random(seed)
+    colleges = []
+    for index in range(size):
+        college = College(
+            id=index + 1,
+            name=f'College {index + 1}',
+            location=rng.choice(LOCATIONS),
+            annual_fees=rng.uniform(30000, 900000),
+            cutoff_general=rng.uniform(40, 98),
+            cutoff_obc=rng.uniform(35, 95),
+            cutoff_sc=rng.uniform(30, 90),
+            cutoff_st=rng.uniform(25, 85),
+            placement_rate=rng.uniform(20, 100),
+            review_score=rng.uniform(1, 5),
+        )
+        college.display_rating = college.review_score
+        # Unsaved colleges have no links, so stand in for the prefetched
+        # lists the views would read.
+        college.get_courses_list = rng.sample(COURSES, rng.randint(1, 5)).copy
+        college.get_facilities_list = list
+        colleges.append(college)
+    return colleges
+
+
+def loop_rank(colleges, marks, category, preferred_courses, preferred_location, budget, min_rating):
+    """The per-college filter/score/sort loop the catalog replaces"""
+    recommendations = []
+    for college in colleges:
+        if preferred_location and preferred_location.lower() not in college.location.lower():
+            continue
+        if preferred_courses and not any(course in college.get_courses_list() for course in preferred_courses):
+            continue
+        if budget > 0 and college.annual_fees > budget:
+            continue
+        if min_rating > 0 and college.display_rating < min_rating:
+            continue
+        score = calculate_match_score(marks, category, preferred_courses, preferred_location, budget, college)
+        if score > 0:
+            recommendations.append((college.id, score))
+    recommendations.sort(key=lambda item: round(item[1], 1), reverse=True)
+    return recommendations[:10]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the vectorized college scorer against the per-college loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        profile = {
+            'marks': 82.5,
+            'category': 'OBC',
+            'preferred_courses': ['BTech', 'MBA'],
+            'preferred_location': '',
+            'budget': 400000,
+            'min_rating': 2.0,
+        }
+
+        self.stdout.write(
+            f"{'colleges':>10} {'loop ms':>10} {'build ms':>10} {'sort ms':>10} {'top-k ms':>10} {'speedup':>8}"
+        )
+        for size in options['sizes']:
+            colleges = build_colleges(size, options['seed'])
+
+            start = time.perf_counter()
+            catalog = CollegeCatalog.from_colleges(colleges)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            loop_ms = self._best_of(options['repeat'], lambda: loop_rank(colleges, **profile))
+            sort_ms = self._best_of(options['repeat'], lambda: catalog.rank(limit=None, **profile)[:10])
+            rank_ms = self._best_of(options['repeat'], lambda: catalog.rank(**profile))
+
+            if catalog.rank(**profile) != loop_rank(colleges, **profile):
+                self.stderr.write(self.style.ERROR(f'Rankings differ at {size} colleges'))
+
+            self.stdout.write(
+                f'{size:>10} {loop_ms:>10.2f} {build_ms:>10.2f} {sort_ms:>10.2f} {rank_ms:>10.2f} '
+                f'{loop_ms / rank_ms:>7.1f}x'
+            )
+
+    def _best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
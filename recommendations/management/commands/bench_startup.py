@@ -0,0 +1,97 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from django.test import Client
+
+from recommendations.models import College, Student
+from recommendations.synthetic import USERNAME_PREFIX
+
+# Runs in a fresh interpreter: load the WSGI application, optionally warm up,
+# then send each path twice, with the given session cookie, and print the
+# timings as JSON.
+SCRIPT = '''
+import io, json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+timings = {'load': time.perf_counter() - start, 'warmup': 0.0}
+
+mode, cookie, paths = sys.argv[1], sys.argv[2], sys.argv[3:]
+if mode == 'warm':
+    from recommendations.warmup import warm_up
+    start = time.perf_counter()
+    warm_up()
+    timings['warmup'] = time.perf_counter() - start
+
+for path in paths:
+    for attempt in ('first', 'second'):
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'wsgi.errors': io.StringIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        start = time.perf_counter()
+        body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        for _ in body:
+            pass
+        if hasattr(body, 'close'):
+            body.close()
+        timings[f'{attempt} {path}'] = time.perf_counter() - start
+        if not statuses[0].startswith('2'):
+            raise SystemExit(f'{path}: {statuses[0]}')
+print(json.dumps(timings))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure a new worker\'s time to its first requests, cold and after recommendations.warmup, '
+        'each in --repeat fresh processes using the current settings, logged in as a seeded student. '
+        'Prints medians; "first" is what the first visitor of a path waits, "second" the steady state. '
+        'Needs data from seed_catalog.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        student = Student.objects.select_related('user').filter(
+            user__username__startswith=USERNAME_PREFIX
+        ).order_by('id').first()
+        college_id = College.objects.order_by('id').values_list('id', flat=True).first()
+        if student is None or college_id is None:
+            raise CommandError('No seeded students or colleges; run seed_catalog first')
+        paths = ['/', '/colleges/', f'/college/{college_id}/', '/api/v1/colleges/']
+
+        # A database session the subprocesses share.
+        client = Client()
+        client.force_login(student.user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        try:
+            results = {}
+            for mode in ('cold', 'warm'):
+                runs = [self._run(mode, cookie, paths) for _ in range(options['repeat'])]
+                results[mode] = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+        finally:
+            client.logout()
+
+        self.stdout.write(f"{'ms (median)':<32} {'cold':>9} {'warm':>9}")
+        for key in results['cold']:
+            self.stdout.write(f"{key:<32} {results['cold'][key]:>9.1f} {results['warm'][key]:>9.1f}")
+        for mode in ('cold', 'warm'):
+            first = sum(value for key, value in results[mode].items() if key.startswith('first'))
+            self.stdout.write(f'{mode}: first requests {first:.0f} ms after {results[mode]["warmup"]:.0f} ms warmup')
+
+    def _run(self, mode, cookie, paths):
+        completed = subprocess.run(
+            [sys.executable, '-c', SCRIPT, mode, cookie, *paths],
+            cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        if completed.returncode:
+            raise CommandError(f'{mode} run failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,78 @@
+import itertools
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from recommendations import fragments
+from recommendations.views import get_colleges_with_rating_data
+
+# Card versions no real page uses, so every cold render misses the cache.
+_cold_versions = itertools.count(-1, -1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering college_list.html with the card fragment cache cold and warm, and results.html, '
+        'for pages of --sizes colleges from the database (see seed_catalog). Queries are not timed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        largest = max(options['sizes'])
+        colleges = list(get_colleges_with_rating_data().order_by('-display_rating', 'id')[:largest])
+        if len(colleges) < largest:
+            raise CommandError(f'Needs {largest} colleges, found {len(colleges)}; run seed_catalog first')
+
+        request = RequestFactory().get('/colleges/')
+        # Unsaved, but authenticated: renders the rating widgets.
+        request.user = User(username='bench-templates')
+        for college in colleges:
+            college.user_rating = None
+
+        self.stdout.write(f"{'cards':>7} {'list cold ms':>13} {'list warm ms':>13} {'speedup':>8} {'results ms':>11}")
+        for size in options['sizes']:
+            page = Paginator(colleges[:size], size).page(1)
+            version = next(_cold_versions)
+
+            def render_list(version):
+                context = {
+                    'colleges': page.object_list,
+                    'page_obj': page,
+                    'locations': [],
+                    'all_courses': [],
+                    **fragments.card_context(version),
+                }
+                return render_to_string('recommendations/college_list.html', context, request)
+
+            cold_ms = self._best_of(options['repeat'], lambda: render_list(next(_cold_versions)))
+            render_list(version)
+            warm_ms = self._best_of(options['repeat'], lambda: render_list(version))
+
+            results = {
+                'student': {'name': 'Bench', 'marks': 80, 'category': 'General', 'preferred_course': 'Any',
+                            'preferred_location': 'Any', 'budget': 500000},
+                'recommendations': [
+                    {'college': college, 'score': 7.5, 'stars': 3.8} for college in page.object_list
+                ],
+            }
+            results_ms = self._best_of(
+                options['repeat'], lambda: render_to_string('recommendations/results.html', results, request)
+            )
+            self.stdout.write(
+                f'{size:>7} {cold_ms:>13.1f} {warm_ms:>13.1f} {cold_ms / warm_ms:>7.1f}x {results_ms:>11.1f}'
+            )
+
+    def _best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,179 @@
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from recommendations.models import College, Student
+from recommendations.synthetic import COURSES, LOCATIONS, USERNAME_PREFIX, seed_catalog
+
+FEE_RANGES = ['0-100000', '100000-300000', '300000-600000', '600000+']
+
+
+def percentiles(timings):
+    """p50/p95/p99 of ``timings`` in milliseconds"""
+    if len(timings) < 2:
+        value = timings[0] if timings else 0.0
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main pages through the Django test client and report p50/p95/p99 latency and '
+        'query counts. Seeds a synthetic catalog inside a transaction that is rolled back, unless '
+        '--existing is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colleges', type=int, default=5000)
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--existing', action='store_true',
+                            help='Benchmark the data already in the database instead of seeding')
+        parser.add_argument('--json', metavar='PATH', help='Also write the results to this file')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against results written by --json')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['results']
+
+        rng = random.Random(options['seed'])
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        with override_settings(ALLOWED_HOSTS=hosts), transaction.atomic():
+            if not options['existing']:
+                if Student.objects.filter(user__username__startswith=USERNAME_PREFIX).exists():
+                    raise CommandError('The database already has seeded students; pass --existing to use them')
+                start = time.perf_counter()
+                seed_catalog(options['colleges'], options['students'], seed=options['seed'])
+                self.stdout.write(f'Seeded data in {time.perf_counter() - start:.1f}s')
+
+            student = Student.objects.select_related('user').filter(
+                user__username__startswith=USERNAME_PREFIX
+            ).order_by('id').first()
+            college_ids = list(College.objects.values_list('id', flat=True))
+            if student is None or len(college_ids) < 2:
+                raise CommandError('No seeded students or colleges; run seed_catalog first or drop --existing')
+
+            client = Client()
+            client.force_login(student.user)
+            results = {
+                name: self._run(client, scenario, options['requests'])
+                for name, scenario in self._scenarios(rng, student, college_ids).items()
+            }
+            transaction.set_rollback(True)
+
+        self._report(results, baseline)
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'requests': options['requests'],
+                    'colleges': len(college_ids),
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(f"Wrote {options['json']}")
+
+    def _scenarios(self, rng, student, college_ids):
+        """Map of scenario name to a callable issuing one request with ``client``"""
+        locations = [location for location, _ in LOCATIONS]
+        form = {
+            'studentName': student.name,
+            'studentEmail': student.email,
+            'marks': student.marks,
+            'category': student.category,
+            'preferred_course': rng.choice(COURSES),
+            'preferred_location': rng.choice(locations),
+            'budget': 800000,
+            'min_rating': 0,
+        }
+
+        def recommendations_cold(client):
+            # New marks every time miss the result cache without clearing it
+            # (which would also reset the catalog version).
+            return client.post(reverse('generate_recommendations'), dict(form, marks=round(rng.uniform(40, 100), 2)))
+
+        def college_list(client):
+            filters = {
+                'location': rng.choice(locations),
+                'course': rng.choice(COURSES),
+                'fees': rng.choice(FEE_RANGES),
+                'min_rating': rng.choice(['', '3', '4']),
+            }
+            # Each filter is present about half the time.
+            query = {key: value for key, value in filters.items() if rng.random() < 0.5}
+            return client.get(reverse('college_list'), query)
+
+        def compare(client):
+            return client.get(reverse('compare_colleges'), {'ids': ','.join(map(str, rng.sample(college_ids, 2)))})
+
+        def lookup(client):
+            prefix = rng.choice(locations)[:rng.randint(1, 4)]
+            return client.get(reverse('college_lookup'), {'q': prefix})
+
+        def search(client):
+            words = [rng.choice(COURSES), rng.choice(locations)]
+            query = ' '.join(rng.sample(words, rng.randint(1, 2)))
+            # A partly typed last word half the time, a typo otherwise.
+            if rng.random() < 0.5:
+                query = query[:len(query) - rng.randint(0, 2)]
+            elif len(query) > 4:
+                position = rng.randrange(1, len(query) - 1)
+                query = query[:position] + query[position + 1:]
+            return client.get(reverse('college_list'), {'search': query})
+
+        def rate(client):
+            return client.post(reverse('rate_college', args=[rng.choice(college_ids)]),
+                               {'rating': rng.randint(1, 5)})
+
+        return {
+            'recommendations (cold)': recommendations_cold,
+            'recommendations (cached)': lambda client: client.post(reverse('generate_recommendations'), form),
+            'college list': college_list,
+            'compare': compare,
+            'college lookup': lookup,
+            'college search': search,
+            'saved colleges': lambda client: client.get(reverse('saved_colleges')),
+            'rate college': rate,
+        }
+
+    def _run(self, client, scenario, requests):
+        timings = []
+        queries = []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = scenario(client)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'Request failed with status {response.status_code}')
+            queries.append(len(captured))
+        result = percentiles(timings)
+        result['queries'] = max(queries)
+        return result
+
+    def _report(self, results, baseline):
+        self.stdout.write(f"{'scenario':<26} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, result in results.items():
+            line = (
+                f"{name:<26} {result['p50']:>9.2f} {result['p95']:>9.2f} {result['p99']:>9.2f} "
+                f"{result['queries']:>8}"
+            )
+            previous = (baseline or {}).get(name)
+            if previous:
+                line += (
+                    f"   p50 {result['p50'] - previous['p50']:+.2f} ms, "
+                    f"p95 {result['p95'] - previous['p95']:+.2f} ms, "
+                    f"queries {result['queries'] - previous['queries']:+d}"
+                )
+            self.stdout.write(line)
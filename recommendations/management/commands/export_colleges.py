@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.catalog_io import DEFAULT_BATCH_SIZE, FORMATS, detect_format, export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Write every college to a CSV or JSONL file that import_colleges reads back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or '-' (default) for standard output")
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension, csv on standard output')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_BATCH_SIZE, help='Colleges read per query')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        try:
+            format = options['format'] or ('csv' if path == '-' else detect_format(path))
+        except ValueError as e:
+            raise CommandError(e)
+
+        if path == '-':
+            write_rows(self.stdout, export_rows(chunk_size=options['chunk_size']), format)
+            return
+        start = time.perf_counter()
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            count = write_rows(stream, export_rows(chunk_size=options['chunk_size']), format)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {count} colleges to {path} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
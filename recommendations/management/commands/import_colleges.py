@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.catalog_io import DEFAULT_BATCH_SIZE, FORMATS, ErrorWriter, detect_format, import_colleges, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update colleges from a CSV or JSONL file, matched on name and location. Only the columns '
+        'present are written, so a file of cutoffs updates just the cutoffs. Each batch is committed on its '
+        'own; rejected rows go to the --errors file with the reason.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for standard input")
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--errors', help='Where to write rejected rows (default: <path>.errors.<format>)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            format = detect_format('' if path == '-' else path, options['format'])
+        except ValueError as e:
+            raise CommandError(e)
+        errors_path = options['errors']
+        if errors_path is None:
+            if path == '-':
+                raise CommandError('--errors is required when reading standard input')
+            errors_path = f'{os.path.splitext(path)[0]}.errors.{format}'
+
+        if path == '-':
+            stream = sys.stdin
+        else:
+            try:
+                # utf-8-sig drops the byte order mark spreadsheet exports start with.
+                stream = open(path, newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(e)
+
+        start = time.perf_counter()
+
+        def progress(counts):
+            if options['verbosity'] >= 2:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{counts['read']} rows read, {counts['read'] / elapsed:.0f} rows/s")
+
+        on_error = ErrorWriter(errors_path, format)
+        try:
+            counts = import_colleges(read_rows(stream, format), options['batch_size'], on_error, progress)
+        except ValueError as e:
+            raise CommandError(e)
+        finally:
+            on_error.close()
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['read']} rows in {elapsed:.1f}s: {counts['created']} colleges created, "
+            f"{counts['updated']} updated, {counts['unchanged']} unchanged "
+            f"({counts['read'] / max(elapsed, 1e-9):.0f} rows/s)"
+        ))
+        if counts['failed']:
+            self.stdout.write(self.style.WARNING(f"{counts['failed']} rows rejected, see {errors_path}"))
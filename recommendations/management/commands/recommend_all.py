@@ -0,0 +1,110 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recommendations.batch import init_worker, rank_in_worker, rank_profiles, student_profile
+from recommendations.models import College, Ranking, Student
+from recommendations.scoring import CollegeCatalog, get_strategy
+
+
+class Command(BaseCommand):
+    help = 'Rank colleges for every student and store the top matches as Ranking rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Students read and ranked per task')
+        parser.add_argument('--limit', type=int, default=10, help='Colleges stored per student')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 ranks in this process)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per Ranking insert')
+        parser.add_argument('--strategy', help='Scoring strategy (default: the SCORING_STRATEGY setting)')
+        parser.add_argument('--resume-from', type=int, default=0, metavar='STUDENT_ID',
+                            help='Only rank students with a larger id')
+
+    def handle(self, *args, **options):
+        for option in ['chunk_size', 'limit', 'workers', 'batch_size']:
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+        try:
+            strategy = get_strategy(options['strategy'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        catalog = CollegeCatalog.from_queryset(College.objects.all())
+        self.stdout.write(f'Loaded {len(catalog)} colleges in {time.perf_counter() - start:.2f}s')
+
+        students = Student.objects.filter(
+            pk__gt=options['resume_from']
+        ).order_by('pk').prefetch_related('course_links__course').iterator(chunk_size=options['chunk_size'])
+        chunks = self._chunks(students, options['chunk_size'])
+
+        start = time.perf_counter()
+        student_count = 0
+        ranking_count = 0
+        for chunk, results in self._rank(chunks, catalog, strategy, options['limit'], options['workers']):
+            self._save(results, options['batch_size'])
+            student_count += len(chunk)
+            ranking_count += len(results)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{student_count} students, {ranking_count} rankings '
+                f'(last student id {chunk[-1][0]}, {student_count / elapsed:.0f} students/s)'
+            )
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ranked {student_count} students in {elapsed:.2f}s '
+            f'({student_count / elapsed:.0f} students/s, {ranking_count / elapsed:.0f} rankings/s)'
+        ))
+
+    def _chunks(self, students, size):
+        profiles = (student_profile(student) for student in students)
+        while chunk := list(islice(profiles, size)):
+            yield chunk
+
+    def _rank(self, chunks, catalog, strategy, limit, workers):
+        """Yield ``(chunk, results)`` in student order"""
+        if workers == 1:
+            for chunk in chunks:
+                yield chunk, rank_profiles(catalog, chunk, limit, strategy)
+            return
+
+        # The catalog and strategy are sent to each worker once; only a few
+        # chunks are in flight at a time so students are streamed rather
+        # than all loaded.
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(catalog, strategy)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(rank_in_worker, chunk, limit)))
+                if len(pending) >= workers * 2:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def _save(self, results, batch_size):
+        rankings = []
+        for student_id, college_id, score in results:
+            score = round(score, 1)
+            rankings.append(Ranking(
+                student_id=student_id,
+                college_id=college_id,
+                total_score=score,
+                star_rating=round(score / 2, 1)
+            ))
+        # One transaction per chunk: an interrupted run can resume from the
+        # last student id reported.
+        with transaction.atomic():
+            Ranking.objects.bulk_create(
+                rankings,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['student', 'college'],
+                update_fields=['total_score', 'star_rating']
+            )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recommendations.models import reconcile_rating_aggregates
+from recommendations.result_cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuild College rating_count, rating_sum and display_rating from CollegeRating rows'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            drifted = reconcile_rating_aggregates()
+        if drifted:
+            bump_catalog_version()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled rating aggregates in {elapsed:.2f}s ({drifted} colleges had drifted)'
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.models import Ranking
+from recommendations.rescoring import get_batch_size, rescore
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the scores of saved rankings, e.g. after bulk changes that bypass model signals '
+        '(queryset.update(), raw SQL) or after rescoring was off. Rescores every ranking unless '
+        '--college or --student narrows it down.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--college', type=int, nargs='+', default=[], metavar='ID')
+        parser.add_argument('--student', type=int, nargs='+', default=[], metavar='ID')
+        parser.add_argument('--batch-size', type=int, default=None, help='Students per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or get_batch_size()
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        rankings = Ranking.objects.all()
+        if options['college']:
+            rankings = rankings.filter(college_id__in=options['college'])
+        if options['student']:
+            rankings = rankings.filter(student_id__in=options['student'])
+
+        start = time.perf_counter()
+        updated = rescore(rankings, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rescored saved rankings in {time.perf_counter() - start:.2f}s ({updated} changed)'
+        ))
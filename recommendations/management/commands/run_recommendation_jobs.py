@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recommendations import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued recommendation jobs, one at a time, for RECOMMENDATION_JOB_RUNNER = '
+        '"recommendations.jobs.DatabaseRunner". Start one process per job you want running '
+        'in parallel. Finished jobs past RECOMMENDATION_JOB_RETENTION are purged while idle.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds to sleep while idle')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0: no limit)')
+
+    def handle(self, *args, **options):
+        processed = 0
+        while not options['max_jobs'] or processed < options['max_jobs']:
+            close_old_connections()
+            if jobs.claim_next():
+                processed += 1
+                continue
+            jobs.expire_stale_jobs()
+            jobs.purge_finished_jobs()
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        counts = jobs.metrics.snapshot()['counts']
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {processed} jobs ({counts['succeeded']} succeeded, {counts['failed']} failed, "
+            f"{counts['timed_out']} timed out)"
+        ))
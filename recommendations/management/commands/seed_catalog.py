@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recommendations.models import College
+from recommendations.synthetic import SEED_PASSWORD, USERNAME_PREFIX, clear_seeded_data, seed_catalog
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a synthetic catalog, students, ratings and saved colleges'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colleges', type=int, default=10000)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--ratings-per-student', type=int, default=3)
+        parser.add_argument('--saved-per-student', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true',
+                            help='First delete ALL colleges, courses and facilities and the seeded users')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            start = time.perf_counter()
+            with transaction.atomic():
+                clear_seeded_data()
+            self.stdout.write(f'Cleared existing data in {time.perf_counter() - start:.1f}s')
+        elif User.objects.filter(username__startswith=USERNAME_PREFIX).exists() or College.objects.exists():
+            raise CommandError('The database already has colleges or seeded users; use --clear to replace them')
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            counts = seed_catalog(
+                colleges=options['colleges'],
+                students=options['students'],
+                ratings_per_student=options['ratings_per_student'],
+                saved_per_student=options['saved_per_student'],
+                seed=options['seed'],
+                batch_size=options['batch_size']
+            )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['colleges']} colleges, {counts['students']} students, {counts['ratings']} ratings "
+            f"and {counts['saved']} saved colleges in {elapsed:.1f}s"
+        ))
+        self.stdout.write(f"Seeded users log in as {USERNAME_PREFIX}<n> with password '{SEED_PASSWORD}'")
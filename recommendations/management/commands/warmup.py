@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recommendations import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the startup warmup (database connections, URLs, templates, translations, facets, catalog '
+        'snapshot, search index) in this process and print how long each step took. wsgi.py and asgi.py '
+        'run the same steps when WARMUP_ON_STARTUP is on.'
+    )
+
+    def handle(self, *args, **options):
+        timings = warmup.warm_up()
+        for name, _ in warmup.STEPS:
+            if name in timings:
+                self.stdout.write(f'{name:<14} {timings[name] * 1000:8.1f} ms')
+            else:
+                self.stdout.write(self.style.WARNING(f'{name:<14}   failed (see the log)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed up in {sum(timings.values()) * 1000:.0f} ms, '
+            f'{len(warmup.template_names())} templates compiled'
+        ))
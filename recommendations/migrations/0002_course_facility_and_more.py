@@ -0,0 +1,105 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Facility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'facilities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CollegeCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('college', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_links', to='recommendations.college')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='college_links', to='recommendations.course')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='college',
+            name='courses',
+            field=models.ManyToManyField(blank=True, related_name='colleges', through='recommendations.CollegeCourse', to='recommendations.course'),
+        ),
+        migrations.CreateModel(
+            name='CollegeFacility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('college', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facility_links', to='recommendations.college')),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='college_links', to='recommendations.facility')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_links', to='recommendations.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_links', to='recommendations.student')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='courses',
+            field=models.ManyToManyField(blank=True, related_name='students', through='recommendations.StudentCourse', to='recommendations.course'),
+        ),
+        migrations.AddIndex(
+            model_name='collegecourse',
+            index=models.Index(fields=['course', 'college'], name='recommendat_course__0225aa_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='collegecourse',
+            unique_together={('college', 'course')},
+        ),
+        migrations.AddIndex(
+            model_name='collegefacility',
+            index=models.Index(fields=['facility', 'college'], name='recommendat_facilit_64247a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='collegefacility',
+            unique_together={('college', 'facility')},
+        ),
+        migrations.AddIndex(
+            model_name='studentcourse',
+            index=models.Index(fields=['course', 'student'], name='recommendat_course__9f8f96_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentcourse',
+            unique_together={('student', 'course')},
+        ),
+    ]
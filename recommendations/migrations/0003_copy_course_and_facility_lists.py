@@ -0,0 +1,72 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def split_list(value):
+    if value:
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return []
+
+
+def get_tags(tag_model, names):
+    tag_model.objects.bulk_create([tag_model(name=name) for name in names], ignore_conflicts=True)
+    return {tag.name: tag.pk for tag in tag_model.objects.filter(name__in=names)}
+
+
+def copy_lists(owner_model, text_field, link_model, owner_field, tag_model, tag_field):
+    rows = owner_model.objects.exclude(**{text_field: ''}).values_list('pk', text_field)
+    names_by_owner = {pk: list(dict.fromkeys(split_list(value))) for pk, value in rows.iterator()}
+    tags = get_tags(tag_model, {name for names in names_by_owner.values() for name in names})
+    link_model.objects.bulk_create(
+        [
+            link_model(**{
+                f'{owner_field}_id': owner_id,
+                f'{tag_field}_id': tags[name],
+                'position': position,
+            })
+            for owner_id, names in names_by_owner.items()
+            for position, name in enumerate(names)
+        ],
+        batch_size=BATCH_SIZE
+    )
+
+
+def restore_lists(owner_model, text_field, link_model, owner_field, tag_field):
+    names_by_owner = {}
+    links = link_model.objects.order_by(owner_field, 'position').values_list(f'{owner_field}_id', f'{tag_field}__name')
+    for owner_id, name in links.iterator():
+        names_by_owner.setdefault(owner_id, []).append(name)
+    owners = list(owner_model.objects.filter(pk__in=names_by_owner))
+    for owner in owners:
+        setattr(owner, text_field, ', '.join(names_by_owner[owner.pk]))
+    owner_model.objects.bulk_update(owners, [text_field], batch_size=BATCH_SIZE)
+
+
+def forwards(apps, schema_editor):
+    College = apps.get_model('recommendations', 'College')
+    Student = apps.get_model('recommendations', 'Student')
+    Course = apps.get_model('recommendations', 'Course')
+    Facility = apps.get_model('recommendations', 'Facility')
+    copy_lists(College, 'courses_offered', apps.get_model('recommendations', 'CollegeCourse'), 'college', Course, 'course')
+    copy_lists(College, 'facilities', apps.get_model('recommendations', 'CollegeFacility'), 'college', Facility, 'facility')
+    copy_lists(Student, 'preferred_courses', apps.get_model('recommendations', 'StudentCourse'), 'student', Course, 'course')
+
+
+def backwards(apps, schema_editor):
+    College = apps.get_model('recommendations', 'College')
+    Student = apps.get_model('recommendations', 'Student')
+    restore_lists(College, 'courses_offered', apps.get_model('recommendations', 'CollegeCourse'), 'college', 'course')
+    restore_lists(College, 'facilities', apps.get_model('recommendations', 'CollegeFacility'), 'college', 'facility')
+    restore_lists(Student, 'preferred_courses', apps.get_model('recommendations', 'StudentCourse'), 'student', 'course')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0002_course_facility_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
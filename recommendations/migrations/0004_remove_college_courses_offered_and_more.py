@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0003_copy_course_and_facility_lists'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='college',
+            name='courses_offered',
+        ),
+        migrations.RemoveField(
+            model_name='college',
+            name='facilities',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='preferred_courses',
+        ),
+        migrations.AddField(
+            model_name='college',
+            name='facilities',
+            field=models.ManyToManyField(blank=True, related_name='colleges', through='recommendations.CollegeFacility', to='recommendations.facility'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:57
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Cast, Coalesce
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    College = apps.get_model('recommendations', 'College')
+    CollegeRating = apps.get_model('recommendations', 'CollegeRating')
+    ratings = CollegeRating.objects.filter(college=OuterRef('pk')).order_by().values('college')
+    College.objects.update(
+        rating_count=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total')), 0),
+        rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total')), 0)
+    )
+    College.objects.update(display_rating=Case(
+        When(rating_count__gt=0, then=Cast(F('rating_sum'), FloatField()) / F('rating_count')),
+        default=F('review_score'),
+        output_field=FloatField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0004_remove_college_courses_offered_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='college',
+            name='display_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='college',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='college',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
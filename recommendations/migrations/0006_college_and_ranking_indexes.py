@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:11
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+# EmailBackend looks users up by email on every login. The user model
+# belongs to another app, so its index is created here directly.
+USER_EMAIL_INDEX = models.Index(fields=['email'], name='user_email_idx')
+
+
+def add_user_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+def remove_user_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0005_college_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='college',
+            index=models.Index(fields=['-display_rating', 'id'], name='college_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='college',
+            index=models.Index(django.db.models.functions.text.Lower('location'), models.OrderBy(models.F('display_rating'), descending=True), models.F('id'), name='college_location_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='college',
+            index=models.Index(fields=['annual_fees', '-display_rating'], name='college_fees_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ranking',
+            index=models.Index(fields=['student', '-total_score', '-created_at'], name='ranking_student_score_idx'),
+        ),
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0007_recommendationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='college',
+            index=models.Index(django.db.models.functions.text.Lower('name'), models.F('id'), name='college_name_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    # Fail with the offending rows rather than a bare IntegrityError.
+    College = apps.get_model('recommendations', 'College')
+    duplicates = list(
+        College.objects.values_list('name', 'location').annotate(count=Count('id')).filter(count__gt=1)[:10]
+    )
+    if duplicates:
+        listed = ', '.join(f'{name!r} in {location!r} ({count})' for name, location, count in duplicates)
+        raise RuntimeError(
+            f'Colleges must be unique by name and location before migrating; merge or rename: {listed}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0008_college_name_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='college',
+            constraint=models.UniqueConstraint(fields=('name', 'location'), name='college_natural_key'),
+        ),
+    ]
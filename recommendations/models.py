@@ -1,7 +1,114 @@
+import uuid
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Lower
+from django.db.models.lookups import GreaterThan
+from django.dispatch import Signal
 from django.contrib.auth.models import User
 
+# Sent by replace_links() with the link model as sender and ``owner_ids``.
+links_replaced = Signal()
+
+
+def split_list(value):
+    """Split a comma-separated string into a list of stripped names"""
+    if value:
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return []
+
+
+def get_or_create_tags(tag_model, names):
+    """Return {name: tag} for the given names, creating missing rows"""
+    names = set(names)
+    if not names:
+        return {}
+    tag_model.objects.bulk_create([tag_model(name=name) for name in names], ignore_conflicts=True)
+    return {tag.name: tag for tag in tag_model.objects.filter(name__in=names)}
+
+
+def replace_links(link_model, owner_field, tag_model, assignments, notify=True):
+    """Replace the ordered tag links of several owners at once.
+
+    ``assignments`` maps owner ids to lists of tag names. Existing links for
+    those owners are dropped and the new ones written in two statements.
+    Pass ``notify=False`` when the caller invalidates for the owners itself.
+    """
+    tag_field = tag_model._meta.model_name
+    tags = get_or_create_tags(tag_model, (name for names in assignments.values() for name in names))
+    link_model.objects.filter(**{f'{owner_field}_id__in': list(assignments)}).delete()
+    link_model.objects.bulk_create([
+        link_model(**{f'{owner_field}_id': owner_id, tag_field: tags[name], 'position': position})
+        for owner_id, names in assignments.items()
+        for position, name in enumerate(dict.fromkeys(names))
+    ])
+    if notify:
+        links_replaced.send(sender=link_model, owner_ids=list(assignments))
+
+
+def linked_names(instance, relation, tag_field):
+    """Names behind an ordered link relation, from the prefetch cache if loaded.
+
+    Read once per instance: templates ask for the same list several times.
+    """
+    if instance.pk is None:
+        return []
+    memo = instance.__dict__.setdefault('_linked_names', {})
+    if relation not in memo:
+        links = getattr(instance, relation)
+        if relation in getattr(instance, '_prefetched_objects_cache', {}):
+            memo[relation] = [getattr(link, tag_field).name for link in links.all()]
+        else:
+            memo[relation] = list(links.values_list(f'{tag_field}__name', flat=True))
+    return memo[relation]
+
+
+def forget_linked_names(instance, relation):
+    """Drop the loaded names of ``relation`` after its links were replaced"""
+    getattr(instance, '_prefetched_objects_cache', {}).pop(relation, None)
+    instance.__dict__.get('_linked_names', {}).pop(relation, None)
+
+
+def display_rating_expression(count=F('rating_count'), total=F('rating_sum'), review_score=F('review_score')):
+    """Average user rating, falling back to the review score when unrated"""
+    return Case(
+        When(GreaterThan(count, 0), then=Cast(total, FloatField()) / count),
+        default=review_score,
+        output_field=FloatField()
+    )
+
+
+class Course(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Facility(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'facilities'
+
+    def __str__(self):
+        return self.name
+
+
+# Category -> College cutoff field, looked up by get_cutoff.
+CUTOFF_FIELDS = {
+    'General': 'cutoff_general',
+    'OBC': 'cutoff_obc',
+    'SC': 'cutoff_sc',
+    'ST': 'cutoff_st',
+}
+
+
 class College(models.Model):
     CATEGORY_CHOICES = [
         ('General', 'General'),
@@ -14,22 +121,14 @@ class College(models.Model):
     location = models.CharField(max_length=100)
     description = models.TextField(blank=True, default='')
     
-    # Courses offered (store as comma-separated string)
-    courses_offered = models.TextField(
-        help_text="Enter courses separated by commas (e.g., BTech, BSc, MBA)",
-        blank=True,
-        default=''
-    )
+    # Courses offered (ordered, see CollegeCourse)
+    courses = models.ManyToManyField(Course, through='CollegeCourse', related_name='colleges', blank=True)
     
     # Fees
     annual_fees = models.FloatField(default=0)
     
-    # Facilities (store as comma-separated string)
-    facilities = models.TextField(
-        help_text="Enter facilities separated by commas (e.g., Hostel, Library, Sports, Lab)",
-        blank=True,
-        default=''
-    )
+    # Facilities (ordered, see CollegeFacility)
+    facilities = models.ManyToManyField(Facility, through='CollegeFacility', related_name='colleges', blank=True)
     
     # Category-wise cutoffs
     cutoff_general = models.FloatField(default=0)
@@ -43,34 +142,119 @@ class College(models.Model):
     
     # Reviews
     review_score = models.FloatField(default=0)
+
+    # User rating aggregates, maintained from CollegeRating writes
+    # (see apply_rating_change and the reconcile_ratings command)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    display_rating = models.FloatField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RATING_AGGREGATE_FIELDS = ('rating_count', 'rating_sum', 'display_rating')
+
+    class Meta:
+        # Access paths of the college list and API: sorted by rating, filtered
+        # by location (case-insensitively) or by a fee range.
+        indexes = [
+            models.Index(fields=['-display_rating', 'id'], name='college_rating_idx'),
+            models.Index(Lower('location'), F('display_rating').desc(), 'id', name='college_location_rating_idx'),
+            models.Index(fields=['annual_fees', '-display_rating'], name='college_fees_rating_idx'),
+            # Name type-ahead on the compare page (views.lookup_colleges).
+            models.Index(Lower('name'), 'id', name='college_name_idx'),
+        ]
+        # Natural key of catalog imports (catalog_io.import_colleges).
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'location'], name='college_natural_key'),
+        ]
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.display_rating = self.rating_sum / self.rating_count if self.rating_count else self.review_score
+            return super().save(*args, **kwargs)
+
+        # Never write back rating aggregates read earlier: they may have been
+        # moved on by concurrent ratings. display_rating is recomputed in the
+        # UPDATE itself when the review score it falls back to is saved.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_AGGREGATE_FIELDS
+            ]
+        update_fields = list(update_fields)
+        if 'review_score' in update_fields:
+            self.display_rating = display_rating_expression(review_score=Value(self.review_score))
+            if 'display_rating' not in update_fields:
+                update_fields.append('display_rating')
+        kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if 'display_rating' in update_fields:
+            self.refresh_from_db(fields=list(self.RATING_AGGREGATE_FIELDS))
+
+    @classmethod
+    def apply_rating_change(cls, college_id, count_delta, sum_delta):
+        """Shift one college's rating aggregates in a single UPDATE; returns the rows updated"""
+        count = F('rating_count') + count_delta
+        total = F('rating_sum') + sum_delta
+        return cls.objects.filter(pk=college_id).update(
+            rating_count=count,
+            rating_sum=total,
+            display_rating=display_rating_expression(count=count, total=total)
+        )
     
     def get_courses_list(self):
-        """Return courses as list"""
-        if self.courses_offered:
-            return [c.strip() for c in self.courses_offered.split(',') if c.strip()]
-        return []
+        """Return courses as list (uses prefetched course_links when present)"""
+        return linked_names(self, 'course_links', 'course')
     
     def get_facilities_list(self):
-        """Return facilities as list"""
-        if self.facilities:
-            return [f.strip() for f in self.facilities.split(',') if f.strip()]
-        return []
+        """Return facilities as list (uses prefetched facility_links when present)"""
+        return linked_names(self, 'facility_links', 'facility')
+
+    def set_courses(self, names):
+        """Replace the courses offered, keeping the given order"""
+        replace_links(CollegeCourse, 'college', Course, {self.pk: names})
+        forget_linked_names(self, 'course_links')
+
+    def set_facilities(self, names):
+        """Replace the facilities, keeping the given order"""
+        replace_links(CollegeFacility, 'college', Facility, {self.pk: names})
+        forget_linked_names(self, 'facility_links')
     
     def get_cutoff(self, category):
         """Get cutoff for specific category"""
-        cutoffs = {
-            'General': self.cutoff_general,
-            'OBC': self.cutoff_obc,
-            'SC': self.cutoff_sc,
-            'ST': self.cutoff_st,
-        }
-        return cutoffs.get(category, 0)
+        field = CUTOFF_FIELDS.get(category)
+        return getattr(self, field) if field else 0
+
+def rating_aggregates():
+    """Count and sum of the ratings of the college in the outer query, as subqueries"""
+    ratings = CollegeRating.objects.filter(college=OuterRef('pk')).order_by().values('college')
+    rating_count = Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total')), 0)
+    rating_sum = Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total')), 0)
+    return rating_count, rating_sum
+
+
+def reconcile_rating_aggregates(colleges=None):
+    """Rebuild rating aggregates from CollegeRating rows.
+
+    Returns the number of colleges whose stored count or sum had drifted.
+    """
+    if colleges is None:
+        colleges = College.objects.all()
+    rating_count, rating_sum = rating_aggregates()
+
+    drifted = colleges.annotate(
+        actual_count=rating_count,
+        actual_sum=rating_sum
+    ).exclude(rating_count=F('actual_count'), rating_sum=F('actual_sum')).count()
+    colleges.update(rating_count=rating_count, rating_sum=rating_sum)
+    colleges.update(display_rating=display_rating_expression())
+    return drifted
+
 
 class Student(models.Model):
     CATEGORY_CHOICES = [
@@ -86,12 +270,8 @@ class Student(models.Model):
     marks = models.FloatField(default=0.0)
     category = models.CharField(max_length=10, choices=CATEGORY_CHOICES, default='General')
     
-    # Preferences (store as comma-separated strings)
-    preferred_courses = models.TextField(
-        help_text="Enter preferred courses separated by commas",
-        blank=True,
-        default=''
-    )
+    # Preferences (ordered, see StudentCourse)
+    courses = models.ManyToManyField(Course, through='StudentCourse', related_name='students', blank=True)
     preferred_location = models.CharField(max_length=100, blank=True, default='')
     budget = models.FloatField(default=0)
     min_rating = models.FloatField(default=3.0)
@@ -102,11 +282,19 @@ class Student(models.Model):
     def __str__(self):
         return self.name or self.user.username
     
+    @property
+    def preferred_courses(self):
+        """Preferred courses as a comma-separated string, as shown in forms"""
+        return ','.join(self.get_preferred_courses_list())
+
     def get_preferred_courses_list(self):
         """Return preferred courses as list"""
-        if self.preferred_courses:
-            return [c.strip() for c in self.preferred_courses.split(',') if c.strip()]
-        return []
+        return linked_names(self, 'course_links', 'course')
+
+    def set_preferred_courses(self, names):
+        """Replace the preferred courses, keeping the given order"""
+        replace_links(StudentCourse, 'student', Course, {self.pk: names})
+        forget_linked_names(self, 'course_links')
     
     def save(self, *args, **kwargs):
         if not self.name and self.user:
@@ -132,6 +320,49 @@ class CollegeRating(models.Model):
     def __str__(self):
         return f"{self.user.username} rated {self.college.name}: {self.rating}/5"
 
+    @classmethod
+    def upsert(cls, college_id, user_id, rating):
+        """Insert or update one user's rating with a single INSERT ... ON CONFLICT.
+
+        Skips the model signals: the college's aggregates are shifted by the
+        difference to the user's previous rating here, and the caller
+        invalidates with ``signals.colleges_changed``. Returns False, writing
+        nothing, when the college does not exist.
+        """
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                # Lock the college row first, so that a concurrent rating by
+                # the same user is read below rather than counted twice.
+                # SQLite needs no lock: its writers are serialized.
+                list(College.objects.select_for_update().filter(pk=college_id).values_list('pk'))
+            previous = cls.objects.filter(college_id=college_id, user_id=user_id).values_list('rating', flat=True).first()
+            cls.objects.bulk_create(
+                [cls(college_id=college_id, user_id=user_id, rating=rating)],
+                update_conflicts=True, unique_fields=['college', 'user'], update_fields=['rating', 'updated_at']
+            )
+            if previous is None:
+                changed = College.apply_rating_change(college_id, 1, rating)
+            elif previous != rating:
+                changed = College.apply_rating_change(college_id, 0, rating - previous)
+            else:
+                # The previous rating proves that the college exists.
+                changed = 1
+            if not changed:
+                # No such college; foreign keys are only checked on commit.
+                transaction.set_rollback(True)
+                return False
+        return True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so saves can apply rating deltas.
+        instance._loaded_values = {
+            'college_id': instance.__dict__.get('college_id'),
+            'rating': instance.__dict__.get('rating'),
+        }
+        return instance
+
 class Ranking(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rankings')
     college = models.ForeignKey(College, on_delete=models.CASCADE, related_name='rankings')
@@ -144,6 +375,124 @@ class Ranking(models.Model):
     class Meta:
         unique_together = ['student', 'college']
         ordering = ['-total_score']
+        indexes = [
+            # Saved colleges: one student's rows, best first.
+            models.Index(fields=['student', '-total_score', '-created_at'], name='ranking_student_score_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.college.name}"
+
+    @classmethod
+    def save_scores(cls, student_id, scores):
+        """Save ``{college_id: score}`` for a student with one INSERT ... ON CONFLICT, keeping created_at"""
+        cls.objects.bulk_create(
+            [
+                cls(student_id=student_id, college_id=college_id, total_score=round(score, 1),
+                    star_rating=round(round(score, 1) / 2, 1))
+                for college_id, score in scores.items()
+            ],
+            update_conflicts=True, unique_fields=['student', 'college'], update_fields=['total_score', 'star_rating']
+        )
+
+
+class CollegeCourse(models.Model):
+    college = models.ForeignKey(College, on_delete=models.CASCADE, related_name='course_links')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='college_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['college', 'course']
+        ordering = ['position']
+        indexes = [models.Index(fields=['course', 'college'])]
+
+    def __str__(self):
+        return f"{self.college.name} - {self.course.name}"
+
+
+class CollegeFacility(models.Model):
+    college = models.ForeignKey(College, on_delete=models.CASCADE, related_name='facility_links')
+    facility = models.ForeignKey(Facility, on_delete=models.CASCADE, related_name='college_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['college', 'facility']
+        ordering = ['position']
+        indexes = [models.Index(fields=['facility', 'college'])]
+
+    def __str__(self):
+        return f"{self.college.name} - {self.facility.name}"
+
+
+class StudentCourse(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='course_links')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['student', 'course']
+        ordering = ['position']
+        indexes = [models.Index(fields=['course', 'student'])]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.course.name}"
+
+
+class RecommendationJob(models.Model):
+    """A recommendation ranking queued to run outside the request (see ``jobs.py``)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    IN_FLIGHT = (QUEUED, RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendation_jobs')
+    # Hash of the user, the displayed name/email and the ranking inputs.
+    key = models.CharField(max_length=64)
+    name = models.CharField(max_length=200, blank=True, default='')
+    email = models.CharField(max_length=254, blank=True, default='')
+    params = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # [[college_id, score], ...] once done
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one queued or running job per key: identical submissions share it.
+            models.UniqueConstraint(
+                fields=['key'], condition=Q(status__in=['queued', 'running']), name='recommendation_job_in_flight_key'
+            ),
+        ]
+        indexes = [
+            # Workers claim the oldest queued job.
+            models.Index(fields=['status', 'created_at'], name='recommendation_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.status} ({self.id})"
+
+    @property
+    def wait_time(self):
+        """Seconds spent queued, or None before the job starts"""
+        if self.started_at is None:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def run_time(self):
+        """Seconds spent running, or None before the job finishes"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
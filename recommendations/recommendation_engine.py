@@ -1,62 +1,29 @@
-#expample of how RecommendationEngine Work.this code is in views.py.recommendation_engine.py is only example,this file not effect the System.
+# Per-component breakdown of a recommendation score. Scores come from the
+# strategies registered in scoring.py, the same ones the views rank with.
+from .scoring import CollegeCatalog
+
+
 class RecommendationEngine:
-    
+
     @staticmethod
-    def calculate_scores(student, college):
-        """Calculate all component scores"""
-        scores = {}
-        
-        # 1. Cutoff Score (30%)
-        cutoff = college.get_cutoff(student.category)
-        if student.marks >= cutoff:
-            scores['cutoff'] = 30
-        else:
-            # Linear penalty for missing cutoff
-            penalty = (cutoff - student.marks) * 0.5
-            scores['cutoff'] = max(0, 30 - penalty)
-        
-        # 2. Course Match (20%)
-        common_courses = set(student.preferred_courses) & set(college.courses_offered)
-        if common_courses:
-            scores['course'] = 20
-        elif student.preferred_courses and college.courses_offered:
-            scores['course'] = 10
-        else:
-            scores['course'] = 5
-        
-        # 3. Location (10%)
-        if student.preferred_location and student.preferred_location.lower() == college.location.lower():
-            scores['location'] = 10
-        else:
-            scores['location'] = 5
-        
-        # 4. Budget Fit (10%)
-        if student.budget >= college.annual_fees:
-            scores['budget'] = 10
-        else:
-            # Penalty based on how much over budget
-            overshoot = college.annual_fees - student.budget
-            penalty = overshoot * 0.001  # 0.1% penalty per unit overshoot
-            scores['budget'] = max(0, 10 - penalty)
-        
-        # 5. Placements (15%)
-        placement_score = (college.placement_rate * 0.08) + (college.avg_package * 0.5)
-        scores['placement'] = min(15, placement_score)
-        
-        # 6. Facilities (5%)
-        scores['facility'] = min(5, len(college.facilities) * 0.5)
-        
-        # 7. Reviews (10%)
-        scores['review'] = college.review_score * 2
-        
-        return scores
-    
+    def calculate_scores(student, college, strategy=None):
+        """Calculate all component scores (points out of 10 in total)"""
+        catalog = CollegeCatalog.from_colleges([college])
+        scores = catalog.component_scores(
+            student.marks or 0,
+            student.category or 'General',
+            student.get_preferred_courses_list(),
+            student.preferred_location or '',
+            student.budget or 0,
+            strategy=strategy
+        )
+        return {component: float(points[0]) for component, points in scores.items()}
+
     @staticmethod
     def calculate_total_score(scores):
         """Calculate total score out of 10"""
-        total = sum(scores.values())
-        return round((total / 100) * 10, 2)
-    
+        return round(sum(scores.values()), 2)
+
     @staticmethod
     def calculate_star_rating(total_score):
         """Convert 0-10 score to 0-5 stars"""
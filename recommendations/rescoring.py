@@ -0,0 +1,239 @@
+"""Keep saved ``Ranking`` scores current as colleges and students change.
+
+``save_college`` stores a score once; without this the score would go stale
+when the college's fees, cutoffs, courses or ratings change, or the student
+edits their profile. The signal handlers in ``signals.py`` call ``schedule``
+with the changed college or student ids, and once the transaction commits
+only the Ranking rows of those colleges or students are rescored, with one
+``bulk_update`` per batch for the rows whose score actually moved.
+
+The work is handed to the queue named by ``RANKING_RESCORE_QUEUE``:
+``InlineQueue`` rescores right after the commit, ``LocalWorkerQueue`` on a
+background thread in this process. Any class with a ``submit(college_ids,
+student_ids)`` method can take their place, e.g. one forwarding the ids to
+an external task queue that calls ``rescore_colleges``/``rescore_students``.
+"""
+import logging
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .batch import student_profile
+from .models import College, Ranking, Student
+from .scoring import CollegeCatalog, get_strategy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def get_batch_size():
+    return getattr(settings, 'RANKING_RESCORE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def rescore(rankings, batch_size=None, strategy=None):
+    """Recompute ``total_score`` and ``star_rating`` for a Ranking queryset.
+
+    Students are handled ``batch_size`` at a time: their rankings, the
+    colleges those rankings point at and their profiles are read in a fixed
+    number of queries, and each student's colleges are scored in one
+    ``CollegeCatalog.score`` call. Returns the number of rows changed.
+    """
+    batch_size = batch_size or get_batch_size()
+    strategy = get_strategy(strategy)
+    student_ids = list(rankings.order_by('student_id').values_list('student_id', flat=True).distinct())
+    updated = 0
+    for start in range(0, len(student_ids), batch_size):
+        chunk = student_ids[start:start + batch_size]
+        rows = list(rankings.filter(student_id__in=chunk).order_by('student_id', 'id').values_list(
+            'id', 'student_id', 'college_id', 'total_score', 'star_rating'
+        ))
+        catalog = CollegeCatalog.from_queryset(College.objects.filter(pk__in={row[2] for row in rows}))
+        positions = {college_id: position for position, college_id in enumerate(catalog.ids.tolist())}
+        profiles = {
+            student.pk: student_profile(student)
+            for student in Student.objects.filter(pk__in=chunk).prefetch_related('course_links__course')
+        }
+
+        changed = []
+        for student_id, group in groupby(rows, key=itemgetter(1)):
+            if student_id not in profiles:
+                continue
+            group = list(group)
+            _, marks, category, courses, location, budget, _ = profiles[student_id]
+            scores = catalog.score(
+                marks, category, courses, location, budget,
+                rows=np.array([positions[row[2]] for row in group], dtype=np.int64),
+                strategy=strategy
+            )
+            # Rounded the way Ranking.save_scores stores them.
+            for (ranking_id, _, _, total_score, star_rating), score in zip(group, scores.tolist()):
+                score = round(score, 1)
+                stars = round(score / 2, 1)
+                if score != total_score or stars != star_rating:
+                    changed.append(Ranking(id=ranking_id, total_score=score, star_rating=stars))
+        Ranking.objects.bulk_update(changed, ['total_score', 'star_rating'], batch_size=batch_size)
+        updated += len(changed)
+    return updated
+
+
+def rescore_colleges(college_ids, batch_size=None):
+    """Rescore every saved ranking of these colleges"""
+    return rescore(Ranking.objects.filter(college_id__in=list(college_ids)), batch_size)
+
+
+def rescore_students(student_ids, batch_size=None):
+    """Rescore these students' saved rankings"""
+    return rescore(Ranking.objects.filter(student_id__in=list(student_ids)), batch_size)
+
+
+def rescore_ids(college_ids=(), student_ids=(), batch_size=None):
+    updated = 0
+    if college_ids:
+        updated += rescore_colleges(college_ids, batch_size)
+    if student_ids:
+        updated += rescore_students(student_ids, batch_size)
+    return updated
+
+
+class InlineQueue:
+    """Rescore as soon as the change commits, in the same thread"""
+
+    def submit(self, college_ids=(), student_ids=()):
+        rescore_ids(college_ids, student_ids)
+
+
+class LocalWorkerQueue:
+    """In-process stand-in for a task queue: one daemon thread rescoring in the background.
+
+    Ids submitted while the worker is busy are merged into one pending set,
+    so a college saved ten times in a row is rescored once or twice rather
+    than ten times. Pending work is lost if the process exits; the
+    ``rescore_rankings`` command catches up.
+    """
+
+    def __init__(self, autostart=True):
+        self.autostart = autostart
+        self._lock = threading.Lock()
+        self._pending_colleges = set()
+        self._pending_students = set()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+
+    def submit(self, college_ids=(), student_ids=()):
+        with self._lock:
+            self._pending_colleges.update(college_ids)
+            self._pending_students.update(student_ids)
+            self._idle.clear()
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ranking-rescore', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def pending(self):
+        """``(college_ids, student_ids)`` waiting to be rescored"""
+        with self._lock:
+            return set(self._pending_colleges), set(self._pending_students)
+
+    def run_pending(self):
+        """Rescore everything submitted so far; returns the number of rows changed"""
+        with self._lock:
+            college_ids, self._pending_colleges = self._pending_colleges, set()
+            student_ids, self._pending_students = self._pending_students, set()
+        return rescore_ids(sorted(college_ids), sorted(student_ids))
+
+    def join(self, timeout=None):
+        """Wait until everything submitted has been rescored"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception('Rescoring saved rankings failed')
+            with self._lock:
+                if not self._pending_colleges and not self._pending_students:
+                    self._idle.set()
+
+
+_queue = None
+_queue_path = None
+
+
+def get_queue():
+    """The queue named by ``RANKING_RESCORE_QUEUE``, or None when rescoring is off"""
+    global _queue, _queue_path
+    path = getattr(settings, 'RANKING_RESCORE_QUEUE', 'recommendations.rescoring.InlineQueue')
+    if path != _queue_path:
+        _queue = import_string(path)() if path else None
+        _queue_path = path
+    return _queue
+
+
+class _Submission:
+    """One ``schedule`` call's ids, submitted on commit unless an earlier call's already were"""
+
+    def __init__(self, batch, college_ids, student_ids):
+        self.batch = batch
+        self.college_ids = set(college_ids)
+        self.student_ids = set(student_ids)
+
+    def __call__(self):
+        if getattr(_local, 'batch', None) is self.batch:
+            # Whatever is scheduled from now on waits for a later commit.
+            _local.batch = None
+        college_ids = self.college_ids - self.batch.college_ids
+        student_ids = self.student_ids - self.batch.student_ids
+        if not college_ids and not student_ids:
+            return
+        self.batch.college_ids.update(college_ids)
+        self.batch.student_ids.update(student_ids)
+        self.batch.queue.submit(sorted(college_ids), sorted(student_ids))
+
+
+class _Batch:
+    """The ids submitted so far by the current transaction's ``_Submission``s"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.college_ids = set()
+        self.student_ids = set()
+
+
+# The current transaction's batch, per thread like database connections.
+# The first of its submissions to run clears it. A batch left behind by a
+# rolled-back transaction submitted nothing, so reusing it changes nothing.
+_local = threading.local()
+
+
+def _current_batch(queue):
+    batch = getattr(_local, 'batch', None)
+    if batch is None or batch.queue is not queue or not transaction.get_connection().in_atomic_block:
+        # Outside a transaction the submission runs at once: nothing to share.
+        batch = _local.batch = _Batch(queue)
+    return batch
+
+
+def schedule(college_ids=(), student_ids=()):
+    """Rescore the rankings of these colleges and students once the current transaction commits.
+
+    Ids already scheduled in the same transaction are skipped, so saving a
+    student and then their courses rescores them once.
+    """
+    queue = get_queue()
+    if queue is None:
+        return
+    # robust: a failed rescore is logged rather than failing a request whose
+    # changes have already been committed.
+    transaction.on_commit(_Submission(_current_batch(queue), college_ids, student_ids), robust=True)
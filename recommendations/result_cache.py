@@ -0,0 +1,168 @@
+"""Shared cache of ranked recommendation results.
+
+Results are stored under a fingerprint of the normalized student inputs and
+the current catalog version. Any College, course link or CollegeRating write
+bumps the version (see ``signals.py``), so stale rankings are never read
+again and simply age out of the cache.
+
+The cache alias is ``RECOMMENDATION_CACHE_ALIAS``. Its ``TIMEOUT`` and
+``MAX_ENTRIES`` options give the TTL and LRU bounds; use a shared backend
+(Redis, Memcached, database) so that every worker sees the same catalog
+version and hit/miss counters.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+CATALOG_VERSION_KEY = 'recommendations:catalog-version'
+HITS_KEY = 'recommendations:result-hits'
+MISSES_KEY = 'recommendations:result-misses'
+
+
+def get_result_cache():
+    return caches[getattr(settings, 'RECOMMENDATION_CACHE_ALIAS', 'default')]
+
+
+def is_process_local(cache):
+    """Whether other processes cannot see what ``cache`` stores"""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def check_shared_caches():
+    """Raise ImproperlyConfigured if a ``REQUIRE_SHARED_CACHES`` alias is process-local"""
+    local = [alias for alias in getattr(settings, 'REQUIRE_SHARED_CACHES', []) if is_process_local(caches[alias])]
+    if local:
+        raise ImproperlyConfigured(
+            f'Cache aliases {", ".join(local)} must use a backend shared between processes, such as Redis'
+        )
+
+
+def _initial_version():
+    # Start from the clock so that no version is handed out twice, even
+    # after the cache is cleared (the in-process snapshots rely on this).
+    return int(time.time() * 1_000_000)
+
+
+def get_version(key=CATALOG_VERSION_KEY):
+    result_cache = get_result_cache()
+    version = result_cache.get(key)
+    if version is None:
+        result_cache.add(key, _initial_version(), timeout=None)
+        version = result_cache.get(key)
+    return version
+
+
+async def aget_version(key=CATALOG_VERSION_KEY):
+    result_cache = get_result_cache()
+    version = await result_cache.aget(key)
+    if version is None:
+        await result_cache.aadd(key, _initial_version(), timeout=None)
+        version = await result_cache.aget(key)
+    return version
+
+
+def bump_version(key=CATALOG_VERSION_KEY):
+    """Move the version under ``key`` on and return the new one"""
+    result_cache = get_result_cache()
+    try:
+        return result_cache.incr(key)
+    except ValueError:
+        result_cache.add(key, _initial_version(), timeout=None)
+        return get_version(key)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    return await aget_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Move to a new catalog version and return it"""
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def fingerprint(marks, category, preferred_courses, preferred_location, budget, min_rating, limit, strategy=None):
+    """Stable hash of the inputs that determine a ranking.
+
+    Course order and location case do not affect scores or filters, so they
+    are normalized away.
+    """
+    payload = json.dumps([
+        float(marks),
+        category,
+        sorted(set(preferred_courses)),
+        (preferred_location or '').lower(),
+        float(budget),
+        float(min_rating),
+        limit,
+        strategy,
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _count(key):
+    result_cache = get_result_cache()
+    try:
+        result_cache.incr(key)
+    except ValueError:
+        if not result_cache.add(key, 1, timeout=None):
+            result_cache.incr(key)
+
+
+def get_or_rank(params, rank):
+    """Return the cached ranking for ``params`` or compute it with ``rank()``"""
+    result_cache = get_result_cache()
+    key = f'recommendations:result:{get_catalog_version()}:{fingerprint(**params)}'
+    ranked = result_cache.get(key)
+    if ranked is not None:
+        _count(HITS_KEY)
+        return ranked
+    _count(MISSES_KEY)
+    ranked = rank()
+    result_cache.set(key, ranked)
+    return ranked
+
+
+async def _acount(key):
+    result_cache = get_result_cache()
+    try:
+        await result_cache.aincr(key)
+    except ValueError:
+        if not await result_cache.aadd(key, 1, timeout=None):
+            await result_cache.aincr(key)
+
+
+async def aget_or_rank(params, rank):
+    """Async ``get_or_rank``; ``rank`` is a coroutine function"""
+    result_cache = get_result_cache()
+    key = f'recommendations:result:{await aget_catalog_version()}:{fingerprint(**params)}'
+    ranked = await result_cache.aget(key)
+    if ranked is not None:
+        await _acount(HITS_KEY)
+        return ranked
+    await _acount(MISSES_KEY)
+    ranked = await rank()
+    await result_cache.aset(key, ranked)
+    return ranked
+
+
+def get_stats():
+    result_cache = get_result_cache()
+    hits = result_cache.get(HITS_KEY, 0)
+    misses = result_cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else 0.0,
+        'catalog_version': get_catalog_version(),
+    }
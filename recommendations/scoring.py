@@ -0,0 +1,595 @@
+"""Column-oriented scoring for the recommendation pages.
+
+``CollegeCatalog`` holds the fields used by ``calculate_match_score`` as NumPy
+arrays so a student can be scored against the whole catalog in one pass
+instead of one Python call per college.
+
+How the components are weighted is decided by a ``ScoringStrategy``. The
+registered strategies are in ``STRATEGIES``; ``SCORING_STRATEGY`` picks the
+default and callers can pass another one per request.
+"""
+import heapq
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+CATEGORIES = ('General', 'OBC', 'SC', 'ST')
+CATEGORY_INDEX = {category: index for index, category in enumerate(CATEGORIES)}
+
+MATCH_WEIGHTS = {
+    'cutoff': 0.30,
+    'course': 0.20,
+    'location': 0.15,
+    'budget': 0.15,
+    'placement': 0.10,
+    'review': 0.10
+}
+
+# The weights RecommendationEngine used: placement and facilities count for
+# more, location and budget for less.
+PLACEMENT_WEIGHTS = {
+    'cutoff': 0.30,
+    'course': 0.20,
+    'location': 0.10,
+    'budget': 0.10,
+    'placement': 0.15,
+    'review': 0.10,
+    'facility': 0.05
+}
+
+DEFAULT_STRATEGY = 'balanced'
+
+# Catalog rows scored per block when ranking with a limit.
+RANK_BLOCK_SIZE = 2048
+# Raw scores further than this below the cut-off round to a lower value.
+ROUNDING_SLACK = 0.1 + 1e-9
+# Guards the upper bound against summation-order rounding differences.
+BOUND_EPSILON = 1e-9
+# Location/course filters are applied up front from the bitmaps when at most
+# 1 / SELECTIVE_FILTER_RATIO of the catalog can pass them.
+SELECTIVE_FILTER_RATIO = 8
+
+ScoringQuery = namedtuple(
+    'ScoringQuery',
+    ['marks', 'category', 'preferred_courses', 'preferred_location', 'budget']
+)
+
+
+def make_query(marks, category, preferred_courses, preferred_location, budget):
+    if isinstance(preferred_courses, str):
+        preferred_courses = [preferred_courses] if preferred_courses else []
+    return ScoringQuery(marks, category, preferred_courses, preferred_location, budget)
+
+
+# Component functions return the points every college earns for a weight,
+# with the same arithmetic as ``calculate_match_score``. Student-dependent
+# components take the query and the catalog rows to score; the others depend
+# on the college only and are computed once per catalog.
+
+def cutoff_points(catalog, query, weight, rows):
+    cutoff = catalog.cutoffs[rows, CATEGORY_INDEX[query.category]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = weight * 10 * (query.marks / cutoff)
+    return np.where(cutoff > 0, np.where(query.marks >= cutoff, weight * 10, partial), 0)
+
+
+def course_points(catalog, query, weight, rows):
+    columns = catalog.course_columns(query.preferred_courses)
+    matched_count = catalog.course_matrix[rows][:, columns].sum(axis=1)
+    return np.where(
+        matched_count > 0,
+        weight * 10 * (matched_count / len(query.preferred_courses)),
+        0
+    )
+
+
+def location_points(catalog, query, weight, rows):
+    exact, overlap, _ = catalog.location_matches(query.preferred_location)
+    table = np.where(exact, weight * 10, np.where(overlap, weight * 7, 0))
+    return table[catalog.location_codes[rows]]
+
+
+def budget_points(catalog, query, weight, rows):
+    fees = catalog.fees[rows]
+    budget = query.budget
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = weight * 10 * np.minimum(budget / fees, 1)
+    return np.where(fees > 0, np.where(fees <= budget, weight * 10, partial), 0)
+
+
+def placement_points(catalog, weight):
+    return np.where(catalog.placement > 0, weight * 10 * (catalog.placement / 100), 0)
+
+
+def review_points(catalog, weight):
+    return np.where(catalog.rating > 0, weight * 10 * (catalog.rating / 5), 0)
+
+
+def facility_points(catalog, weight):
+    return weight * 10 * (np.minimum(catalog.facility_counts * 0.5, 5) / 5)
+
+
+# ``active(query)`` says whether a student-dependent component applies; it is
+# None for college-only components. Scores add components in this order.
+Component = namedtuple('Component', ['points', 'active'])
+
+COMPONENTS = {
+    'cutoff': Component(cutoff_points, lambda query: query.category in CATEGORY_INDEX),
+    'course': Component(course_points, lambda query: bool(query.preferred_courses)),
+    'location': Component(location_points, lambda query: bool(query.preferred_location)),
+    'budget': Component(budget_points, lambda query: query.budget > 0),
+    'placement': Component(placement_points, None),
+    'review': Component(review_points, None),
+    'facility': Component(facility_points, None),
+}
+
+
+class ScoringStrategy:
+    """A named weight set compiled against ``COMPONENTS``.
+
+    ``weight_vector`` holds the non-zero weights in ``components`` order and
+    is read-only. ``request_table`` and ``static_table`` pair each component
+    function with its weight, so scoring does no per-call dict work.
+    """
+
+    def __init__(self, name, weights):
+        unknown = set(weights) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Unknown scoring components: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.components = tuple(component for component in COMPONENTS if weights.get(component))
+        self.weight_vector = np.array([weights[component] for component in self.components], dtype=np.float64)
+        self.weight_vector.flags.writeable = False
+        self.request_table = tuple(
+            (COMPONENTS[component].points, COMPONENTS[component].active, float(weights[component]))
+            for component in self.components
+            if COMPONENTS[component].active is not None
+        )
+        self.static_table = tuple(
+            (COMPONENTS[component].points, float(weights[component]))
+            for component in self.components
+            if COMPONENTS[component].active is None
+        )
+
+    def __repr__(self):
+        return f'<ScoringStrategy {self.name}>'
+
+    def __reduce__(self):
+        # The component table holds lambdas, so pickle the weights and
+        # compile again on the other side (e.g. in recommend_all workers).
+        return (type(self), (self.name, self.weights))
+
+    @property
+    def weights(self):
+        return dict(zip(self.components, self.weight_vector.tolist()))
+
+    def score_many(self, student, colleges):
+        """Score a Student against a CollegeCatalog or College instances"""
+        if not isinstance(colleges, CollegeCatalog):
+            colleges = CollegeCatalog.from_colleges(colleges)
+        return colleges.score(
+            student.marks or 0,
+            student.category or 'General',
+            student.get_preferred_courses_list(),
+            student.preferred_location or '',
+            student.budget or 0,
+            strategy=self
+        )
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name, weights):
+    """Compile ``weights`` and make them selectable as ``name``"""
+    strategy = ScoringStrategy(name, weights)
+    STRATEGIES[name] = strategy
+    return strategy
+
+
+def get_strategy(name=None):
+    """Look up a registered strategy; None means ``settings.SCORING_STRATEGY``"""
+    if isinstance(name, ScoringStrategy):
+        return name
+    if name is None:
+        name = getattr(settings, 'SCORING_STRATEGY', DEFAULT_STRATEGY)
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f'Unknown scoring strategy {name!r}') from None
+
+
+register_strategy('balanced', MATCH_WEIGHTS)
+register_strategy('placement_weighted', PLACEMENT_WEIGHTS)
+
+
+class FilterIndex:
+    """Packed bitmaps (one bit per catalog row) for location and course membership.
+
+    The location and course filters match a set of locations or courses, so
+    the candidates are an OR of their bitmaps; ANDing the two costs a pass
+    over ``len(catalog) / 8`` bytes.
+    """
+
+    def __init__(self, catalog):
+        self.size = len(catalog)
+        self.location_bitmaps = np.packbits(
+            catalog.location_codes[np.newaxis, :] == np.arange(len(catalog.locations))[:, np.newaxis], axis=1
+        )
+        self.course_bitmaps = np.packbits(catalog.course_matrix.T, axis=1)
+        self.location_counts = np.bincount(catalog.location_codes, minlength=len(catalog.locations))
+        self.course_counts = catalog.course_matrix.sum(axis=0)
+
+    def estimate(self, location_codes=None, course_columns=None):
+        """Upper bound on the number of ``candidates``, without touching the bitmaps"""
+        estimate = self.size
+        if location_codes is not None:
+            estimate = min(estimate, int(self.location_counts[location_codes].sum()))
+        if course_columns is not None:
+            estimate = min(estimate, int(self.course_counts[course_columns].sum()))
+        return estimate
+
+    @staticmethod
+    def _union(bitmaps, members):
+        if not len(members):
+            return np.zeros(bitmaps.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(bitmaps[members], axis=0)
+
+    def candidates(self, location_codes=None, course_columns=None):
+        """Mask of rows at one of ``location_codes`` offering one of ``course_columns``.
+
+        None skips that filter; an empty list matches nothing.
+        """
+        bitmap = None
+        if location_codes is not None:
+            bitmap = self._union(self.location_bitmaps, location_codes)
+        if course_columns is not None:
+            courses = self._union(self.course_bitmaps, course_columns)
+            bitmap = courses if bitmap is None else bitmap & courses
+        if bitmap is None:
+            return np.ones(self.size, dtype=bool)
+        return np.unpackbits(bitmap, count=self.size).astype(bool)
+
+
+class CollegeCatalog:
+    """Snapshot of the college table laid out as one array per field.
+
+    Locations and courses are dictionary-encoded: ``location_codes`` indexes
+    into ``locations`` and ``course_matrix[i, j]`` says whether college ``i``
+    offers ``courses[j]``.
+    """
+
+    def __init__(self, ids, fees, cutoffs, placement, rating, locations, courses, facility_counts=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        size = len(self.ids)
+        self.fees = np.asarray(fees, dtype=np.float64)
+        self.cutoffs = np.asarray(cutoffs, dtype=np.float64).reshape(size, len(CATEGORIES))
+        self.placement = np.asarray(placement, dtype=np.float64)
+        self.rating = np.asarray(rating, dtype=np.float64)
+        if facility_counts is None:
+            facility_counts = np.zeros(size)
+        self.facility_counts = np.asarray(facility_counts, dtype=np.float64)
+
+        location_index = {}
+        self.location_codes = np.fromiter(
+            (location_index.setdefault(location or '', len(location_index)) for location in locations),
+            dtype=np.int32,
+            count=size
+        )
+        self.locations = list(location_index)
+
+        self.course_index = {}
+        rows = []
+        cols = []
+        for row, college_courses in enumerate(courses):
+            for course in college_courses:
+                rows.append(row)
+                cols.append(self.course_index.setdefault(course, len(self.course_index)))
+        self.courses = list(self.course_index)
+        self.course_matrix = np.zeros((size, len(self.courses)), dtype=bool)
+        self.course_matrix[rows, cols] = True
+
+        self._static = {}
+        self._filter_index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_colleges(cls, colleges):
+        """Build a catalog from College instances (annotated or not)"""
+        colleges = list(colleges)
+        return cls(
+            ids=[college.id or 0 for college in colleges],
+            fees=[college.annual_fees for college in colleges],
+            cutoffs=[[college.get_cutoff(category) for category in CATEGORIES] for college in colleges],
+            placement=[college.placement_rate for college in colleges],
+            rating=[getattr(college, 'display_rating', college.review_score) for college in colleges],
+            locations=[college.location for college in colleges],
+            courses=[college.get_courses_list() for college in colleges],
+            facility_counts=[len(college.get_facilities_list()) for college in colleges]
+        )
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """Build a catalog from a College queryset.
+
+        Rows are read with ``values_list``, and course names and facility
+        counts come straight from the link tables, so no model instances are
+        created.
+        """
+        # Imported here so worker processes can unpickle a catalog without
+        # setting up Django (see ``batch.py``).
+        from django.db.models import Count
+
+        from .models import CollegeCourse, CollegeFacility
+
+        rows = list(queryset.order_by('id').values_list(
+            'id',
+            'annual_fees',
+            'cutoff_general',
+            'cutoff_obc',
+            'cutoff_sc',
+            'cutoff_st',
+            'placement_rate',
+            'display_rating',
+            'location'
+        ))
+        college_ids = queryset.order_by().values('id')
+        courses = {row[0]: [] for row in rows}
+        links = CollegeCourse.objects.filter(
+            college_id__in=college_ids
+        ).order_by('college_id', 'position').values_list('college_id', 'course__name')
+        for college_id, name in links:
+            if college_id in courses:
+                courses[college_id].append(name)
+        facility_counts = dict(
+            CollegeFacility.objects.filter(college_id__in=college_ids)
+            .order_by()
+            .values_list('college_id')
+            .annotate(count=Count('id'))
+        )
+        return cls(
+            ids=[row[0] for row in rows],
+            fees=[row[1] for row in rows],
+            cutoffs=[row[2:6] for row in rows],
+            placement=[row[6] for row in rows],
+            rating=[row[7] for row in rows],
+            locations=[row[8] for row in rows],
+            courses=list(courses.values()),
+            facility_counts=[facility_counts.get(row[0], 0) for row in rows]
+        )
+
+    @property
+    def filter_index(self):
+        """The ``FilterIndex`` for this catalog, built on first use"""
+        if self._filter_index is None:
+            self._filter_index = FilterIndex(self)
+        return self._filter_index
+
+    def patched(self, changed, removed_ids=()):
+        """A copy with the colleges in catalog ``changed`` added or replaced and ``removed_ids`` dropped.
+
+        Works on the arrays alone, so keeping a catalog current after a
+        college is saved costs no more than reading that college.
+        """
+        drop = np.isin(self.ids, np.concatenate([changed.ids, np.asarray(removed_ids, dtype=np.int64)]))
+        keep = ~drop
+
+        locations = list(self.locations)
+        location_index = {location: code for code, location in enumerate(locations)}
+        changed_codes = np.array(
+            [location_index.setdefault(location, len(location_index)) for location in changed.locations],
+            dtype=np.int32
+        )
+        locations = list(location_index)
+
+        course_index = dict(self.course_index)
+        for course in changed.courses:
+            course_index.setdefault(course, len(course_index))
+        course_matrix = np.zeros((keep.sum() + len(changed), len(course_index)), dtype=bool)
+        course_matrix[:keep.sum(), :len(self.courses)] = self.course_matrix[keep]
+        course_matrix[keep.sum():, [course_index[course] for course in changed.courses]] = changed.course_matrix
+
+        ids = np.concatenate([self.ids[keep], changed.ids])
+        order = np.argsort(ids, kind='stable')
+        catalog = object.__new__(type(self))
+        catalog.ids = ids[order]
+        catalog.fees = np.concatenate([self.fees[keep], changed.fees])[order]
+        catalog.cutoffs = np.concatenate([self.cutoffs[keep], changed.cutoffs])[order]
+        catalog.placement = np.concatenate([self.placement[keep], changed.placement])[order]
+        catalog.rating = np.concatenate([self.rating[keep], changed.rating])[order]
+        catalog.facility_counts = np.concatenate([self.facility_counts[keep], changed.facility_counts])[order]
+        catalog.location_codes = np.concatenate(
+            [self.location_codes[keep], changed_codes[changed.location_codes]]
+        )[order]
+        catalog.locations = locations
+        catalog.course_index = course_index
+        catalog.courses = list(course_index)
+        catalog.course_matrix = course_matrix[order]
+        catalog._static = {}
+        catalog._filter_index = None
+        return catalog
+
+    def location_matches(self, preferred_location):
+        """Per-location (equal, overlapping, contains preference) lookups"""
+        preferred = preferred_location.lower()
+        exact = np.zeros(len(self.locations), dtype=bool)
+        overlap = np.zeros(len(self.locations), dtype=bool)
+        contains = np.zeros(len(self.locations), dtype=bool)
+        for code, location in enumerate(self.locations):
+            location = location.lower()
+            if not location:
+                continue
+            exact[code] = preferred == location
+            contains[code] = preferred in location
+            overlap[code] = contains[code] or location in preferred
+        return exact, overlap, contains
+
+    def course_columns(self, preferred_courses):
+        return [self.course_index[course] for course in preferred_courses if course in self.course_index]
+
+    def static_points(self, strategy):
+        """College-only component points for a strategy, computed once.
+
+        Returns the per-component arrays, their total, and the catalog rows
+        ordered by that total, highest first (ties in id order). Together
+        with the most a student can add, the total bounds every score.
+        """
+        cached = self._static.get(strategy)
+        if cached is None:
+            arrays = [points(self, weight) for points, weight in strategy.static_table]
+            total = np.zeros(len(self))
+            for array in arrays:
+                total += array
+            cached = (arrays, total, np.argsort(-total, kind='stable'))
+            self._static[strategy] = cached
+        return cached
+
+    def component_scores(self, marks, category, preferred_courses, preferred_location, budget, strategy=None):
+        """Points per component name for every college, for explaining a score"""
+        strategy = get_strategy(strategy)
+        query = make_query(marks, category, preferred_courses, preferred_location, budget)
+        scores = {}
+        for component, (points, active, weight) in zip(strategy.components, strategy.request_table):
+            scores[component] = points(self, query, weight, slice(None)) if active(query) else np.zeros(len(self))
+        static_components = strategy.components[len(strategy.request_table):]
+        scores.update(zip(static_components, self.static_points(strategy)[0]))
+        return scores
+
+    def score(self, marks, category, preferred_courses, preferred_location, budget, rows=None, strategy=None):
+        """Return every college's score under ``strategy`` (default: the setting).
+
+        Components are added in ``COMPONENTS`` order with the arithmetic of
+        ``calculate_match_score``, so the balanced strategy reproduces it bit
+        for bit. ``rows`` restricts scoring to those catalog positions.
+        """
+        strategy = get_strategy(strategy)
+        query = make_query(marks, category, preferred_courses, preferred_location, budget)
+        if rows is None:
+            rows = slice(None)
+
+        score = np.zeros(len(self.fees[rows]))
+        for points, active, weight in strategy.request_table:
+            if active(query):
+                score += points(self, query, weight, rows)
+        for array in self.static_points(strategy)[0]:
+            score += array[rows]
+        return score
+
+    def filter_mask(self, preferred_courses, preferred_location, budget, min_rating, rows=None):
+        """Boolean mask of colleges passing the recommendation filters"""
+        if rows is None:
+            rows = slice(None)
+        fees = self.fees[rows]
+        mask = np.ones(len(fees), dtype=bool)
+
+        if preferred_location:
+            _, _, contains = self.location_matches(preferred_location)
+            mask &= contains[self.location_codes[rows]]
+
+        if preferred_courses:
+            mask &= self.course_matrix[rows][:, self.course_columns(preferred_courses)].any(axis=1)
+
+        if budget > 0:
+            mask &= fees <= budget
+
+        if min_rating > 0:
+            mask &= self.rating[rows] >= min_rating
+
+        return mask
+
+    def set_filter_codes(self, preferred_courses, preferred_location):
+        """Location codes and course columns the filters accept (None: no filter)"""
+        location_codes = None
+        if preferred_location:
+            location_codes = np.flatnonzero(self.location_matches(preferred_location)[2])
+        course_columns = self.course_columns(preferred_courses) if preferred_courses else None
+        return location_codes, course_columns
+
+    def max_request_points(self, category, preferred_courses, preferred_location, budget, strategy=None):
+        """Most points the student-dependent components can add to any college"""
+        strategy = get_strategy(strategy)
+        query = make_query(0, category, preferred_courses, preferred_location, budget)
+        points = 0
+        for _, active, weight in strategy.request_table:
+            if active(query):
+                points += weight * 10
+        return points
+
+    def rank(self, marks, category, preferred_courses, preferred_location, budget, min_rating, limit=10,
+             strategy=None):
+        """Return ``(college_id, score)`` pairs for the best matches.
+
+        Ordering matches a stable descending sort on the score rounded to one
+        decimal, with ties kept in catalog (id) order. Scores are unrounded.
+
+        With a ``limit`` colleges are scored in blocks, highest upper bound
+        first, and scoring stops once no remaining college can reach the
+        current top ``limit``. ``limit=None`` scores and sorts everything.
+        """
+        strategy = get_strategy(strategy)
+        if isinstance(preferred_courses, str):
+            preferred_courses = [preferred_courses] if preferred_courses else []
+        if limit is None:
+            scores = self.score(marks, category, preferred_courses, preferred_location, budget, strategy=strategy)
+            keep = self.filter_mask(preferred_courses, preferred_location, budget, min_rating) & (scores > 0)
+            return self._ordered(np.flatnonzero(keep), scores[keep], None)
+        if limit <= 0:
+            return []
+
+        _, static_total, bound_order = self.static_points(strategy)
+        request_points = self.max_request_points(
+            category, preferred_courses, preferred_location, budget, strategy=strategy
+        )
+        location_codes, course_columns = self.set_filter_codes(preferred_courses, preferred_location)
+        if self.filter_index.estimate(location_codes, course_columns) * SELECTIVE_FILTER_RATIO < len(self):
+            # Few colleges can pass: intersect the bitmaps up front rather
+            # than scoring blocks that are mostly filtered out.
+            candidates = self.filter_index.candidates(location_codes, course_columns)
+            bound_order = bound_order[candidates[bound_order]]
+            if not len(bound_order):
+                return []
+        block_size = max(limit * 8, RANK_BLOCK_SIZE)
+        pool_rows = np.empty(0, dtype=np.int64)
+        pool_scores = np.empty(0)
+        threshold = -np.inf
+
+        for start in range(0, len(bound_order), block_size):
+            block = bound_order[start:start + block_size]
+            if static_total[block[0]] + request_points + BOUND_EPSILON < threshold:
+                break
+
+            scores = self.score(
+                marks, category, preferred_courses, preferred_location, budget, rows=block, strategy=strategy
+            )
+            mask = self.filter_mask(preferred_courses, preferred_location, budget, min_rating, rows=block)
+            keep = mask & (scores > 0)
+            pool_rows = np.concatenate([pool_rows, block[keep]])
+            pool_scores = np.concatenate([pool_scores, scores[keep]])
+
+            if len(pool_scores) >= limit:
+                # Anything more than ROUNDING_SLACK below the limit-th best raw
+                # score rounds strictly lower, so it can never make the cut.
+                kth = np.partition(pool_scores, len(pool_scores) - limit)[len(pool_scores) - limit]
+                threshold = kth - ROUNDING_SLACK
+                survivors = pool_scores >= threshold
+                pool_rows = pool_rows[survivors]
+                pool_scores = pool_scores[survivors]
+
+        return self._ordered(pool_rows, pool_scores, limit)
+
+    def _ordered(self, rows, scores, limit):
+        # Python's round() is used rather than np.round so half-way values
+        # come out exactly as they did in the per-college loop; catalog rows
+        # are in id order, so the row breaks ties like a stable sort would.
+        keyed = (
+            (-round(value, 1), row, value)
+            for row, value in zip(rows.tolist(), scores.tolist())
+        )
+        if limit is None:
+            selected = sorted(keyed)
+        else:
+            selected = heapq.nsmallest(limit, keyed)
+        return [(int(self.ids[row]), value) for _, row, value in selected]
@@ -0,0 +1,345 @@
+"""Full-text college search over name, location, description and courses.
+
+``SearchIndex`` is an in-process inverted index from normalized tokens to
+the colleges containing them, each posting weighted by the field it came
+from (``FIELD_WEIGHTS``). A query matches colleges containing every query
+token, ranked by the sum of idf x weight over the tokens:
+
+* the last token also matches longer terms starting with it, so results
+  follow the user's typing (autocomplete);
+* a token found nowhere matches terms within one edit (two for long
+  tokens), looked up through a trigram index on the vocabulary, so a typo
+  still finds the college.
+
+Work is proportional to the postings of the query's terms, not to the
+catalog: tokens are intersected starting with the rarest, and the others
+are only probed for the colleges still in the running.
+
+The index is kept like the catalog snapshot: built once per search version
+(bumped by text changes in ``signals.py``), patched in place on commit for
+changes made in this process, and rebuilt when another process moved the
+version on or, without a shared cache, once it is ``SNAPSHOT_MAX_AGE`` old
+(see ``snapshots``).
+"""
+import heapq
+import json
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import College, CollegeCourse
+from .result_cache import bump_version, get_version
+from .snapshots import VersionedSnapshot
+
+SEARCH_VERSION_KEY = 'recommendations:search-version'
+
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'location': 2.0,
+    'courses': 1.5,
+    'description': 1.0
+}
+# Score multipliers for terms matched by prefix or within an edit distance.
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.5
+# Added when the college name starts with the whole query.
+NAME_PREFIX_BONUS = 2.0
+# Longer terms a prefix expands to (most frequent first), and how many
+# vocabulary entries are looked at to find them.
+MAX_PREFIX_TERMS = 50
+MAX_PREFIX_SCAN = 5000
+# Tokens shorter than this are never matched fuzzily.
+MIN_FUZZY_LENGTH = 4
+# Matches looked up in the database by id. Beyond this, reading the ids of
+# the filtered colleges is cheaper than a query parameter per match, and
+# querysets get the ids as one JSON array parameter (``filter_ids``).
+MAX_ID_PARAMETERS = 1000
+# Subqueries unpacking a JSON array parameter into rows of ids, by vendor.
+JSON_ID_ROWS = {
+    'sqlite': 'SELECT value FROM json_each(%s)',
+    'postgresql': 'SELECT jsonb_array_elements_text(%s::jsonb)::bigint',
+}
+
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lowercase ``text`` and strip accents"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize(text))
+
+
+def trigrams(term):
+    padded = f'${term}$'
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between ``a`` and ``b``, or ``limit + 1`` if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """Inverted index over ``(college_id, name, location, description, courses)`` documents"""
+
+    def __init__(self, documents=()):
+        self._lock = threading.RLock()
+        # term -> {college_id: weight}
+        self.postings = {}
+        # college_id -> (normalized name, terms)
+        self.documents = {}
+        # Sorted (normalized name, college_id) pairs, for the name prefix bonus.
+        self.names = []
+        self.vocabulary = []
+        self.trigram_terms = defaultdict(set)
+        # Sorted once after the initial load, then kept sorted by update().
+        self._loaded = False
+        for document in documents:
+            self._add(*document)
+        self.vocabulary = sorted(self.postings)
+        self.names = sorted((name, college_id) for college_id, (name, _) in self.documents.items())
+        self._loaded = True
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _add(self, college_id, name, location, description, courses):
+        weights = defaultdict(float)
+        fields = (('name', name), ('location', location), ('courses', ' '.join(courses)),
+                  ('description', description))
+        for field, text in fields:
+            for term, count in Counter(tokenize(text)).items():
+                weights[term] += FIELD_WEIGHTS[field] * (1 + math.log(count))
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                for trigram in trigrams(term):
+                    self.trigram_terms[trigram].add(term)
+                if self._loaded:
+                    insort(self.vocabulary, term)
+            postings[college_id] = weight
+        name = ' '.join(tokenize(name))
+        self.documents[college_id] = (name, list(weights))
+        if self._loaded:
+            insort(self.names, (name, college_id))
+
+    def _remove(self, college_id):
+        if college_id not in self.documents:
+            return
+        name, terms = self.documents.pop(college_id)
+        del self.names[bisect_left(self.names, (name, college_id))]
+        for term in terms:
+            postings = self.postings[term]
+            del postings[college_id]
+            if not postings:
+                del self.postings[term]
+                for trigram in trigrams(term):
+                    self.trigram_terms[trigram].discard(term)
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+
+    def update(self, documents, removed_ids=()):
+        """Add or replace ``documents`` and drop ``removed_ids``, in place"""
+        with self._lock:
+            for college_id in removed_ids:
+                self._remove(college_id)
+            for document in documents:
+                self._remove(document[0])
+                self._add(*document)
+
+    def prefix_terms(self, prefix):
+        """The most frequent longer terms starting with ``prefix``"""
+        start = bisect_left(self.vocabulary, prefix)
+        candidates = []
+        for term in self.vocabulary[start:start + MAX_PREFIX_SCAN]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                candidates.append(term)
+        return heapq.nlargest(MAX_PREFIX_TERMS, candidates, key=lambda term: len(self.postings[term]))
+
+    def fuzzy_terms(self, token):
+        """Terms within one edit of ``token`` (two from eight characters on)"""
+        limit = 1 if len(token) < 8 else 2
+        grams = trigrams(token)
+        # Each edit changes at most three trigrams.
+        required = len(grams) - 3 * limit
+        shared = Counter(term for gram in grams for term in self.trigram_terms.get(gram, ()))
+        return [
+            term for term, count in shared.items()
+            if count >= required and edit_distance(token, term, limit) <= limit
+        ]
+
+    def expand(self, token, prefix=False):
+        """``[(term, factor)]`` for the terms ``token`` matches"""
+        matches = []
+        if token in self.postings:
+            matches.append((token, 1.0))
+        if prefix:
+            matches.extend((term, PREFIX_FACTOR) for term in self.prefix_terms(token))
+        if not matches and len(token) >= MIN_FUZZY_LENGTH:
+            matches.extend((term, FUZZY_FACTOR) for term in self.fuzzy_terms(token))
+        return matches
+
+    @staticmethod
+    def _token_scores(terms, candidates=None):
+        """``{college_id: best weight x factor}`` over a token's terms, within ``candidates`` if given"""
+        best = {}
+        for postings, factor in terms:
+            if candidates is None:
+                items = postings.items()
+            else:
+                # The intersection iterates the smaller side.
+                items = ((college_id, postings[college_id]) for college_id in candidates.keys() & postings.keys())
+            for college_id, weight in items:
+                score = weight * factor
+                if score > best.get(college_id, 0):
+                    best[college_id] = score
+        return best
+
+    def search(self, query, limit=None):
+        """``[(college_id, score)]`` of colleges matching every token of ``query``, best first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        # Still typing the last word unless the query ends in a space.
+        typing = not query[-1].isspace()
+
+        with self._lock:
+            size = len(self.documents)
+            expanded = []
+            for index, token in enumerate(tokens):
+                terms = [
+                    (self.postings[term], math.log(1 + size / len(self.postings[term])) * factor)
+                    for term, factor in self.expand(token, prefix=typing and index == len(tokens) - 1)
+                ]
+                if not terms:
+                    return []
+                expanded.append(terms)
+            # Start from the token with the fewest postings; the rest are probed.
+            expanded.sort(key=lambda terms: sum(len(postings) for postings, _ in terms))
+
+            scores = self._token_scores(expanded[0])
+            for terms in expanded[1:]:
+                matched = self._token_scores(terms, scores)
+                scores = {college_id: scores[college_id] + score for college_id, score in matched.items()}
+
+            # Only names starting with the phrase are looked at, via the sorted names.
+            phrase = ' '.join(tokens)
+            names = self.names
+            for index in range(bisect_left(names, (phrase,)), len(names)):
+                name, college_id = names[index]
+                if not name.startswith(phrase):
+                    break
+                if college_id in scores:
+                    scores[college_id] += NAME_PREFIX_BONUS
+        if limit is None:
+            return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def college_documents(colleges):
+    """``SearchIndex`` documents for a College queryset, read with two queries"""
+    rows = list(colleges.order_by('id').values_list('id', 'name', 'location', 'description'))
+    courses = {row[0]: [] for row in rows}
+    links = CollegeCourse.objects.filter(
+        college_id__in=colleges.order_by().values('id')
+    ).order_by('college_id', 'position').values_list('college_id', 'course__name')
+    for college_id, name in links:
+        courses[college_id].append(name)
+    return [(college_id, name, location, description, courses[college_id])
+            for college_id, name, location, description in rows]
+
+
+def get_search_version():
+    return get_version(SEARCH_VERSION_KEY)
+
+
+def bump_search_version():
+    return bump_version(SEARCH_VERSION_KEY)
+
+
+def build_index():
+    return SearchIndex(college_documents(College.objects.all()))
+
+
+snapshot = VersionedSnapshot(get_search_version, build_index)
+
+
+def get_index():
+    """The index of all colleges at the current search version"""
+    return snapshot.get()
+
+
+def search_ids(query, limit=None):
+    """Ids of the colleges matching ``query``, best first"""
+    return [college_id for college_id, _ in get_index().search(query, limit)]
+
+
+def filter_ids(colleges, ids):
+    """The ``colleges`` queryset limited to ``ids``, without a parameter per id beyond MAX_ID_PARAMETERS"""
+    ids = list(ids)
+    sql = JSON_ID_ROWS.get(connections[colleges.db].vendor)
+    if len(ids) <= MAX_ID_PARAMETERS or sql is None:
+        return colleges.filter(id__in=ids)
+    return colleges.filter(id__in=RawSQL(sql, [json.dumps(ids)]))
+
+
+def search_ranked_ids(colleges, query):
+    """Ids of the ``colleges`` queryset matching ``query``, best first.
+
+    Every match is checked against the queryset's filters before anything is
+    cut off, so a page never misses colleges behind better matches that the
+    filters drop.
+    """
+    ranked = search_ids(query)
+    colleges = colleges.order_by()
+    if len(ranked) > MAX_ID_PARAMETERS:
+        matching = set(colleges.values_list('id', flat=True))
+    else:
+        matching = set(colleges.filter(id__in=ranked).values_list('id', flat=True))
+    return [college_id for college_id in ranked if college_id in matching]
+
+
+def colleges_changed(college_ids):
+    """Bump the search version and patch ``college_ids`` in once the transaction commits"""
+    college_ids = list(college_ids)
+    transaction.on_commit(lambda: _patch(college_ids, bump_search_version()))
+
+
+def _patch(college_ids, version):
+    def update(index):
+        documents = college_documents(College.objects.filter(pk__in=college_ids))
+        removed = set(college_ids) - {document[0] for document in documents}
+        index.update(documents, removed)
+        return index
+
+    snapshot.patch(version, update)
+
+
+def clear():
+    snapshot.clear()
@@ -1,30 +1,70 @@
 from rest_framework import serializers
-from .models import Student, College, Ranking
+from .models import Student, College, Ranking, split_list
+from .scoring import STRATEGIES
+
+
+def requested_fields(request):
+    """Field names from a ``?fields=a,b`` sparse fieldset (empty means all)"""
+    if request is None:
+        return []
+    return split_list(request.query_params.get('fields', ''))
+
+
+class SparseFieldsMixin:
+    """Only serialize the fields named in the request's ``?fields=``"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
 
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
 
-class CollegeSerializer(serializers.ModelSerializer):
+class CollegeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    courses_offered = serializers.ListField(source='get_courses_list', read_only=True)
+    facilities = serializers.ListField(source='get_facilities_list', read_only=True)
+
     class Meta:
         model = College
-        fields = '__all__'
-    
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Convert JSON fields to proper format
-        if isinstance(data.get('courses_offered'), str):
-            data['courses_offered'] = eval(data['courses_offered'])
-        if isinstance(data.get('facilities'), str):
-            data['facilities'] = eval(data['facilities'])
-        return data
-
-class RankingSerializer(serializers.ModelSerializer):
+        exclude = ['courses']
+
+class RankingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     college_name = serializers.CharField(source='college.name', read_only=True)
     college_location = serializers.CharField(source='college.location', read_only=True)
     
     class Meta:
         model = Ranking
-        fields = ['id', 'college_name', 'college_location', 'total_score', 
-                  'star_rating', 'created_at']
\ No newline at end of file
+        fields = ['id', 'college', 'college_name', 'college_location', 'total_score', 
+                  'star_rating', 'created_at']
+
+
+class RecommendationSerializer(serializers.Serializer):
+    college = CollegeSerializer(read_only=True)
+    score = serializers.FloatField(read_only=True)
+    stars = serializers.FloatField(read_only=True)
+
+
+class RecommendationQuerySerializer(serializers.Serializer):
+    """Query parameters for the recommendations endpoint.
+
+    Omitted values fall back to the student's saved preferences.
+    """
+    marks = serializers.FloatField(min_value=0, max_value=100, required=False)
+    category = serializers.ChoiceField(choices=Student.CATEGORY_CHOICES, required=False)
+    courses = serializers.ListField(child=serializers.CharField(), required=False)
+    location = serializers.CharField(required=False, allow_blank=True)
+    budget = serializers.FloatField(min_value=0, required=False)
+    min_rating = serializers.FloatField(min_value=0, max_value=5, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    strategy = serializers.CharField(required=False)
+
+    def validate_strategy(self, value):
+        if value not in STRATEGIES:
+            raise serializers.ValidationError(f"Choose one of: {', '.join(sorted(STRATEGIES))}")
+        return value
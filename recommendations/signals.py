@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog_snapshot, fragments, rescoring, search, students
+from .facets import invalidate_facets
+from .models import (
+    College,
+    CollegeCourse,
+    CollegeFacility,
+    CollegeRating,
+    Course,
+    Facility,
+    Student,
+    StudentCourse,
+    links_replaced,
+    reconcile_rating_aggregates,
+)
+from .result_cache import bump_catalog_version
+
+
+def colleges_changed(*college_ids):
+    # Both wait for the commit.
+    catalog_snapshot.colleges_changed(college_ids)
+    rescoring.schedule(college_ids=college_ids)
+
+
+def college_text_changed(*college_ids):
+    # Ratings and facilities are not searched; names, descriptions and courses are.
+    search.colleges_changed(college_ids)
+
+
+def college_rows_changed(college_ids):
+    """Invalidate once for colleges written in bulk, which skips the receivers below.
+
+    Like the version bumps, the facets are dropped only once the writes commit:
+    a request in between would cache them again from the old rows.
+    """
+    transaction.on_commit(invalidate_facets)
+    colleges_changed(*college_ids)
+    college_text_changed(*college_ids)
+
+
+@receiver([post_save, post_delete], sender=College)
+def college_saved(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_facets)
+    colleges_changed(instance.pk)
+    college_text_changed(instance.pk)
+
+
+def bump_catalog_versions(search_index=True):
+    # Run on commit, so that no request reads a new version with old rows.
+    bump_catalog_version()
+    if search_index:
+        search.bump_search_version()
+    fragments.bump_card_version()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_catalog_changed(sender, **kwargs):
+    # A renamed or removed course touches every college offering it, so the
+    # catalog snapshot and search index are rebuilt rather than patched.
+    transaction.on_commit(invalidate_facets)
+    transaction.on_commit(bump_catalog_versions)
+
+
+@receiver([post_save, post_delete], sender=Facility)
+def facility_catalog_changed(sender, **kwargs):
+    # Facility names are shown on cached compare pages and college cards.
+    transaction.on_commit(lambda: bump_catalog_versions(search_index=False))
+
+
+def touch_colleges(college_ids):
+    # Cached college cards are keyed on updated_at, which link writes skip.
+    College.objects.filter(pk__in=college_ids).update(updated_at=timezone.now())
+
+
+@receiver(links_replaced, sender=CollegeCourse)
+def college_courses_changed(sender, owner_ids, **kwargs):
+    touch_colleges(owner_ids)
+    transaction.on_commit(invalidate_facets)
+    colleges_changed(*owner_ids)
+    college_text_changed(*owner_ids)
+
+
+@receiver(links_replaced, sender=CollegeFacility)
+def college_facilities_changed(sender, owner_ids, **kwargs):
+    # Facility counts are scored by the placement_weighted strategy.
+    touch_colleges(owner_ids)
+    colleges_changed(*owner_ids)
+
+
+@receiver(post_save, sender=CollegeRating)
+def rating_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    changed = [instance.college_id]
+    if created:
+        College.apply_rating_change(instance.college_id, 1, instance.rating)
+    elif loaded is None:
+        # Saved without being loaded first: the old value is unknown.
+        reconcile_rating_aggregates(College.objects.filter(pk=instance.college_id))
+    elif loaded['college_id'] != instance.college_id:
+        College.apply_rating_change(loaded['college_id'], -1, -loaded['rating'])
+        College.apply_rating_change(instance.college_id, 1, instance.rating)
+        changed.append(loaded['college_id'])
+    elif loaded['rating'] != instance.rating:
+        College.apply_rating_change(instance.college_id, 0, instance.rating - loaded['rating'])
+    instance._loaded_values = {'college_id': instance.college_id, 'rating': instance.rating}
+    colleges_changed(*changed)
+
+
+@receiver(post_delete, sender=CollegeRating)
+def rating_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {
+        'college_id': instance.college_id,
+        'rating': instance.rating,
+    }
+    College.apply_rating_change(loaded['college_id'], -1, -loaded['rating'])
+    colleges_changed(loaded['college_id'])
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, raw=False, **kwargs):
+    # A new student has no saved rankings yet.
+    if not created and not raw:
+        rescoring.schedule(student_ids=[instance.pk])
+
+
+def forget_students_on_commit(user_ids):
+    # Dropped earlier, the entry could be cached again from the old rows by a
+    # request running before the commit.
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: students.forget_students(user_ids))
+
+
+@receiver([post_save, post_delete], sender=Student)
+def student_profile_changed(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        forget_students_on_commit([instance.user_id])
+
+
+@receiver(links_replaced, sender=StudentCourse)
+def student_courses_changed(sender, owner_ids, **kwargs):
+    forget_students_on_commit(
+        Student.objects.filter(pk__in=owner_ids, user__isnull=False).values_list('user_id', flat=True)
+    )
+    rescoring.schedule(student_ids=owner_ids)
@@ -0,0 +1,68 @@
+"""Process-wide values built from the database and kept between requests.
+
+A ``VersionedSnapshot`` is built once per version of a key in the result
+cache (see ``result_cache``) and rebuilt when the version moves on. Changes
+made in this process are patched in after they commit, moving the snapshot
+to the version they bumped to; a version it skipped was someone else's
+change, and the next ``get()`` rebuilds.
+
+That only works when every process reads versions from the same cache. With
+a process-local one (the locmem default) another worker's bump is never
+seen, so snapshots older than ``SNAPSHOT_MAX_AGE`` seconds are rebuilt as
+well. None turns the age limit off; production settings do so because they
+require a shared cache (see ``check_shared_caches`` in ``result_cache``).
+"""
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_MAX_AGE = 60
+
+
+def get_max_age():
+    return getattr(settings, 'SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE)
+
+
+class VersionedSnapshot:
+    """The value ``build()`` returns, kept while ``get_version()`` does not change"""
+
+    def __init__(self, get_version, build):
+        self.get_version = get_version
+        self.build = build
+        self._lock = threading.Lock()
+        # (version, time.monotonic() when built, value)
+        self._current = None
+
+    def _is_current(self, current, version):
+        if current is None or current[0] != version:
+            return False
+        max_age = get_max_age()
+        return max_age is None or time.monotonic() - current[1] < max_age
+
+    def get(self):
+        version = self.get_version()
+        current = self._current
+        if not self._is_current(current, version):
+            with self._lock:
+                current = self._current
+                if not self._is_current(current, version):
+                    current = (version, time.monotonic(), self.build())
+                    self._current = current
+        return current[2]
+
+    def patch(self, version, update):
+        """Replace the value with ``update(value)`` and move it to ``version``.
+
+        Skipped when there is no value yet or a version in between was someone
+        else's change. The build time is kept: the patch only covers this
+        process's changes.
+        """
+        with self._lock:
+            current = self._current
+            if current is None or current[0] < version - 1:
+                return
+            self._current = (max(current[0], version), current[1], update(current[2]))
+
+    def clear(self):
+        self._current = None
@@ -0,0 +1,93 @@
+"""The logged-in user's Student profile as ``request.student``.
+
+``StudentMiddleware`` sets a lazy ``request.student``, like Django's
+``request.user``: the profile is looked up the first time it is used, at most
+once per request, and is None for anonymous users and users without one. Its
+``user`` is the request's user, so following it costs no query either.
+
+Profiles are cached per user, preferred courses included, in Django's cache
+framework (the ``default`` alias unless ``STUDENT_CACHE_ALIAS`` says
+otherwise) for ``STUDENT_CACHE_TIMEOUT`` seconds. Signal handlers in
+``signals.py`` drop the entry when the student or their courses change; the
+timeout bounds staleness after a course is renamed. Those handlers only
+reach the cache of the process that made the change, so a process-local
+backend (locmem) is not used: other workers would keep serving the old or
+deleted profile.
+
+The lookup runs queries, so async views must not touch ``request.student``.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+
+from .models import Student
+from .result_cache import is_process_local
+
+STUDENT_CACHE_KEY = 'recommendations:student:{}'
+
+# Tells a cached "no profile" (None) apart from a cache miss.
+_missing = object()
+
+
+def get_student_cache():
+    """The cache for profiles, or None when it is process-local"""
+    student_cache = caches[getattr(settings, 'STUDENT_CACHE_ALIAS', 'default')]
+    return None if is_process_local(student_cache) else student_cache
+
+
+def get_student(request):
+    """The Student of ``request.user`` or None, read at most once per request"""
+    if not hasattr(request, '_cached_student'):
+        request._cached_student = load_student(request.user)
+    return request._cached_student
+
+
+def load_student(user):
+    if not user.is_authenticated:
+        return None
+    student_cache = get_student_cache()
+    key = STUDENT_CACHE_KEY.format(user.pk)
+    student = _missing if student_cache is None else student_cache.get(key, _missing)
+    if student is _missing:
+        student = Student.objects.filter(user_id=user.pk).prefetch_related('course_links__course').first()
+        if student_cache is not None:
+            student_cache.set(key, student, getattr(settings, 'STUDENT_CACHE_TIMEOUT', 60))
+    if student is not None:
+        # Attached after caching: the user is not stored with the profile.
+        student.user = user
+    return student
+
+
+def get_or_create_student(request):
+    """The Student of ``request.user``, created from the user's name and email if missing"""
+    student = get_student(request)
+    if student is None:
+        student = Student.objects.create(
+            user=request.user,
+            name=request.user.get_full_name().strip(),
+            email=request.user.email
+        )
+        request._cached_student = request.student = student
+    return student
+
+
+def forget_students(user_ids):
+    student_cache = get_student_cache()
+    if student_cache is not None:
+        student_cache.delete_many([STUDENT_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+class StudentMiddleware:
+    """Set the lazy ``request.student``; needs AuthenticationMiddleware before it"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.student = SimpleLazyObject(lambda: get_student(request))
+        return self.get_response(request)
@@ -0,0 +1,181 @@
+"""Deterministic synthetic data for benchmarks and local load testing.
+
+Colleges get a hidden quality tier that drives cutoffs, fees, placements and
+reviews together, so filters and rankings behave like they do on real data.
+The same seed always produces the same rows.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .facets import invalidate_facets
+from .models import (
+    College,
+    CollegeCourse,
+    CollegeFacility,
+    CollegeRating,
+    Course,
+    Facility,
+    Ranking,
+    Student,
+    StudentCourse,
+    reconcile_rating_aggregates,
+    replace_links,
+)
+from .result_cache import bump_catalog_version
+
+USERNAME_PREFIX = 'seed-'
+# Every seeded user can log in with this password.
+SEED_PASSWORD = 'seed-password'
+
+# (city, relative weight)
+LOCATIONS = [
+    ('Delhi', 12), ('Mumbai', 11), ('Bangalore', 10), ('Pune', 8), ('Chennai', 8), ('Hyderabad', 8),
+    ('Kolkata', 6), ('Ahmedabad', 5), ('Jaipur', 4), ('Lucknow', 4), ('Chandigarh', 3), ('Indore', 3),
+    ('Bhopal', 3), ('Coimbatore', 3), ('Navi Mumbai', 2), ('New Delhi', 2),
+]
+COURSES = [
+    'BTech', 'MTech', 'BSc', 'MSc', 'BCA', 'MCA', 'BBA', 'MBA', 'BCom', 'MCom',
+    'BA', 'LLB', 'MBBS', 'BDS', 'BPharm', 'BArch',
+]
+FACILITIES = [
+    'Library', 'Hostel', 'Wifi', 'Labs', 'Sports Complex', 'Gym', 'Cafeteria', 'Auditorium',
+    'Medical Centre', 'Transport', 'Incubator', 'Swimming Pool',
+]
+CATEGORIES = [('General', 50), ('OBC', 27), ('SC', 15), ('ST', 8)]
+NAME_STEMS = ['Institute of Technology', 'University', 'College of Engineering', 'School of Management',
+              'College of Arts and Science', 'Institute of Science']
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
+
+def generate_colleges(rng, count):
+    """Return ``(unsaved College, courses, facilities)`` triples"""
+    colleges = []
+    for index in range(count):
+        tier = rng.betavariate(2, 3)
+        location = _weighted(rng, LOCATIONS)
+        general = round(_clip(40 + 55 * tier + rng.gauss(0, 4), 30, 99.5), 2)
+        college = College(
+            name=f'{location} {rng.choice(NAME_STEMS)} {index + 1}',
+            location=location,
+            description=f'Synthetic college {index + 1}',
+            annual_fees=round(_clip(40000 * (1 + 12 * tier) * rng.uniform(0.6, 1.6), 15000, 2500000), -2),
+            cutoff_general=general,
+            cutoff_obc=round(max(general - rng.uniform(2, 8), 0), 2),
+            cutoff_sc=round(max(general - rng.uniform(8, 18), 0), 2),
+            cutoff_st=round(max(general - rng.uniform(10, 22), 0), 2),
+            placement_rate=round(_clip(30 + 65 * tier + rng.gauss(0, 6), 5, 100), 1),
+            avg_package=round(_clip(2.5 + 20 * tier ** 2 + rng.gauss(0, 1), 1.5, 45), 2),
+            review_score=round(_clip(2 + 3 * tier + rng.gauss(0, 0.4), 1, 5), 1),
+        )
+        courses = rng.sample(COURSES, rng.randint(1, 6))
+        facilities = rng.sample(FACILITIES, rng.randint(2, 2 + int(8 * tier)))
+        colleges.append((college, courses, facilities))
+    return colleges
+
+
+def generate_student(rng, user, index):
+    """Return an unsaved Student for ``user`` and its preferred courses"""
+    student = Student(
+        user=user,
+        name=f'Student {index + 1}',
+        email=user.email,
+        marks=round(_clip(rng.gauss(70, 14), 25, 100), 2),
+        category=_weighted(rng, CATEGORIES),
+        preferred_location='' if rng.random() < 0.4 else _weighted(rng, LOCATIONS),
+        budget=0 if rng.random() < 0.2 else round(rng.uniform(50000, 1200000), -3),
+        min_rating=rng.choice([0, 2, 3, 3, 3.5]),
+    )
+    return student, rng.sample(COURSES, rng.randint(1, 3))
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def seed_catalog(colleges, students, ratings_per_student=3, saved_per_student=5, seed=42, batch_size=1000):
+    """Insert a synthetic catalog, student population, ratings and saved colleges.
+
+    Bulk inserts skip the model signals, so rating aggregates are reconciled
+    and the caches invalidated once at the end. Returns the row counts.
+    """
+    rng = random.Random(seed)
+
+    college_specs = generate_colleges(rng, colleges)
+    college_rows = []
+    for batch in _batches(college_specs, batch_size):
+        saved = College.objects.bulk_create([college for college, _, _ in batch])
+        replace_links(CollegeCourse, 'college', Course, {
+            college.pk: courses for college, (_, courses, _) in zip(saved, batch)
+        })
+        replace_links(CollegeFacility, 'college', Facility, {
+            college.pk: facilities for college, (_, _, facilities) in zip(saved, batch)
+        })
+        college_rows.extend(zip(saved, (spec[0].review_score for spec in batch)))
+
+    # Hashing is deliberately slow, so every user shares one hash.
+    password = make_password(SEED_PASSWORD)
+    student_rows = []
+    for batch in _batches(range(students), batch_size):
+        users = User.objects.bulk_create([
+            User(
+                username=f'{USERNAME_PREFIX}{index + 1}',
+                email=f'{USERNAME_PREFIX}{index + 1}@example.com',
+                password=password
+            )
+            for index in batch
+        ])
+        specs = [generate_student(rng, user, index) for user, index in zip(users, batch)]
+        saved = Student.objects.bulk_create([student for student, _ in specs])
+        replace_links(StudentCourse, 'student', Course, {
+            student.pk: courses for student, (_, courses) in zip(saved, specs)
+        })
+        student_rows.extend(saved)
+
+    ratings = []
+    rankings = []
+    for student in student_rows:
+        picks = rng.sample(college_rows, min(ratings_per_student + saved_per_student, len(college_rows)))
+        for college, review_score in picks[:ratings_per_student]:
+            ratings.append(CollegeRating(
+                college=college,
+                user_id=student.user_id,
+                rating=int(_clip(round(review_score + rng.gauss(0, 0.8)), 1, 5))
+            ))
+        for college, _ in picks[ratings_per_student:]:
+            score = round(rng.uniform(3, 9.5), 1)
+            rankings.append(Ranking(student=student, college=college, total_score=score,
+                                    star_rating=round(score / 2, 1)))
+    CollegeRating.objects.bulk_create(ratings, batch_size=batch_size)
+    Ranking.objects.bulk_create(rankings, batch_size=batch_size)
+
+    reconcile_rating_aggregates()
+    transaction.on_commit(invalidate_facets)
+    transaction.on_commit(bump_catalog_version)
+    return {
+        'colleges': len(college_rows),
+        'students': len(student_rows),
+        'ratings': len(ratings),
+        'saved': len(rankings),
+    }
+
+
+def clear_seeded_data():
+    """Delete every college, course and facility plus the seeded users"""
+    College.objects.all().delete()
+    Course.objects.all().delete()
+    Facility.objects.all().delete()
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    transaction.on_commit(invalidate_facets)
+    transaction.on_commit(bump_catalog_version)
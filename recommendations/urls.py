@@ -1,5 +1,16 @@
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import include, path
+from . import api, async_views, views
+
+# Pages with an async version (see async_views.py) when serving through ASGI.
+page_views = async_views if settings.ASYNC_VIEWS else views
+
+api_urlpatterns = [
+    path('colleges/', api.CollegeListView.as_view(), name='college-list'),
+    path('colleges/<int:pk>/', api.CollegeDetailView.as_view(), name='college-detail'),
+    path('recommendations/', api.RecommendationView.as_view(), name='recommendations'),
+    path('saved-colleges/', api.SavedCollegeListView.as_view(), name='saved-colleges'),
+]
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -9,13 +20,19 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.profile_view, name='profile'),
     path('edit-profile/', views.edit_profile, name='edit_profile'),
-    path('colleges/', views.college_list, name='college_list'),
-    path('college/<int:college_id>/', views.college_detail, name='college_detail'),
+    path('colleges/', page_views.college_list, name='college_list'),
+    path('colleges/lookup/', views.college_lookup, name='college_lookup'),
+    path('college/<int:college_id>/', page_views.college_detail, name='college_detail'),
     path('college/<int:college_id>/rate/', views.rate_college, name='rate_college'),
-    path('generate/', views.generate_recommendations, name='generate_recommendations'),
+    path('generate/', page_views.generate_recommendations, name='generate_recommendations'),
+    path('recommendations/<uuid:job_id>/', views.recommendation_job, name='recommendation_job'),
+    path('recommendations/<uuid:job_id>/status/', views.recommendation_job_status, name='recommendation_job_status'),
     path('save-college/', views.save_college, name='save_college'),
+    path('save-colleges/', views.save_colleges, name='save_colleges'),
     path('saved-colleges/', views.saved_colleges, name='saved_colleges'),
     path('saved-colleges/remove/<int:college_id>/', views.remove_saved_college, name='remove_saved_college'),
     path('save-dashboard-preferences/', views.save_dashboard_preferences, name='save_dashboard_preferences'),
-    path('compare/', views.compare_colleges, name='compare_colleges'),
+    path('compare/', page_views.compare_colleges, name='compare_colleges'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/v1/', include((api_urlpatterns, 'api'), namespace='v1')),
 ]
@@ -1,12 +1,34 @@
+import math
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count, F, FloatField, Q
-from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Value
+from django.db.models.functions import Lower
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from django.utils.http import url_has_allowed_host_and_scheme
-from .models import Student, College, Ranking, CollegeRating
+from .models import (
+    Student, College, Ranking, CollegeRating, CollegeCourse, CollegeFacility, RecommendationJob, split_list
+)
+from . import catalog_snapshot, facets, fragments, instrumentation, jobs, result_cache, signals
+from .scoring import MATCH_WEIGHTS, get_strategy
+from .search import filter_ids, search_ranked_ids
+from .students import forget_students, get_or_create_student
+
+COLLEGE_LIST_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+MAX_COMPARE_COLLEGES = 6
+LOOKUP_LIMIT = 10
+MAX_LOOKUP_LIMIT = 50
+MAX_BULK_SAVE = 50
 
 def home(request):
     return render(request, 'recommendations/home.html')
@@ -66,7 +88,6 @@ def register_view(request):
             email=email,
             marks=0,
             category='General',
-            preferred_courses='',
             preferred_location='',
             budget=0,
             min_rating=3.0
@@ -83,27 +104,11 @@ def logout_view(request):
 
 @login_required
 def dashboard(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
-    
-    # Get distinct locations for filter
-    locations = College.objects.values_list('location', flat=True).distinct().order_by('location')
-    locations = [loc for loc in locations if loc]
-    
-    # Get all courses from all colleges
-    all_courses = set()
-    for college in College.objects.all():
-        courses = college.get_courses_list()
-        all_courses.update(courses)
-    all_courses = sorted(list(all_courses))
-    
     context = {
-        'student': student,
+        'student': request.student,
         'user': request.user,
-        'locations': locations,
-        'all_courses': all_courses
+        'locations': facets.get_locations(),
+        'all_courses': facets.get_courses()
     }
     return render(request, 'recommendations/student_dashboard.html', context)
 
@@ -111,11 +116,12 @@ def dashboard(request):
 def save_dashboard_preferences(request):
     if request.method == 'POST':
         try:
-            student = Student.objects.get(user=request.user)
+            student = request.student
+            if not student:
+                raise Student.DoesNotExist('Student profile not found.')
             
             # Get selected courses from checkboxes
-            selected_courses = request.POST.getlist('courses')
-            student.preferred_courses = ','.join(selected_courses)
+            selected_courses = [c.strip() for c in request.POST.getlist('courses') if c.strip()]
             
             # Get location
             student.preferred_location = request.POST.get('location', '')
@@ -128,8 +134,11 @@ def save_dashboard_preferences(request):
             student.min_rating = float(min_rating_val) if min_rating_val else 3.0
             
             student.save()
+            student.set_preferred_courses(selected_courses)
 
-            context = prepare_recommendation_context(
+            messages.success(request, 'Preferences saved successfully! Showing your latest recommendations.')
+            return recommendations_response(
+                request,
                 name=student.name or request.user.get_full_name() or request.user.username,
                 email=student.email or request.user.email,
                 marks=student.marks or 0,
@@ -139,8 +148,6 @@ def save_dashboard_preferences(request):
                 budget=student.budget or 0,
                 min_rating=student.min_rating or 0
             )
-            messages.success(request, 'Preferences saved successfully! Showing your latest recommendations.')
-            return render(request, 'recommendations/results.html', context)
         except Exception as e:
             messages.error(request, f'Error saving preferences: {str(e)}')
         
@@ -149,172 +156,212 @@ def save_dashboard_preferences(request):
     return redirect('dashboard')
 
 def get_colleges_with_rating_data():
-    return College.objects.annotate(
-        rating_count=Count('ratings', distinct=True),
-        display_rating=Coalesce(
-            Avg('ratings__rating'),
-            F('review_score'),
-            output_field=FloatField()
-        )
+    # rating_count and display_rating are stored on College and kept up to
+    # date by the CollegeRating signal handlers.
+    return College.objects.prefetch_related(
+        Prefetch('course_links', queryset=CollegeCourse.objects.select_related('course')),
+        Prefetch('facility_links', queryset=CollegeFacility.objects.select_related('facility'))
     )
 
-def prepare_recommendation_context(
-    name,
-    email,
+def filter_by_courses(colleges, courses):
+    """Keep colleges offering any of the courses, using the course index"""
+    return colleges.filter(
+        id__in=CollegeCourse.objects.filter(course__name__in=courses).values('college_id')
+    )
+
+def recommendation_params(
     marks,
     category,
     preferred_courses,
     preferred_location,
     budget,
-    min_rating
+    min_rating,
+    limit=10,
+    strategy=None
 ):
+    """Normalized ranking inputs, as passed to ``CollegeCatalog.rank`` and the result cache"""
     normalized_courses = []
     for course in preferred_courses or []:
         course_name = str(course).strip()
         if course_name and course_name not in normalized_courses:
             normalized_courses.append(course_name)
 
-    all_colleges = get_colleges_with_rating_data()
-    filtered_colleges = []
-
-    for college in all_colleges:
-        include = True
-
-        if preferred_location and preferred_location.lower() not in college.location.lower():
-            include = False
-
-        if normalized_courses:
-            college_courses = college.get_courses_list()
-            if not any(course in college_courses for course in normalized_courses):
-                include = False
-
-        if budget > 0 and college.annual_fees > budget:
-            include = False
-
-        if min_rating > 0 and college.display_rating < min_rating:
-            include = False
-
-        if include:
-            filtered_colleges.append(college)
+    return {
+        'marks': marks,
+        'category': category,
+        'preferred_courses': normalized_courses,
+        'preferred_location': preferred_location,
+        'budget': budget,
+        'min_rating': min_rating,
+        'limit': limit,
+        'strategy': get_strategy(strategy).name
+    }
 
+def build_recommendation_context(name, email, params, ranked, college_map):
     recommendations = []
-    for college in filtered_colleges:
-        score = calculate_match_score(
-            marks=marks,
-            category=category,
-            preferred_courses=normalized_courses,
-            preferred_location=preferred_location,
-            budget=budget,
-            college=college
-        )
-        if score > 0:
-            recommendations.append({
-                'college': college,
-                'score': round(score, 1),
-                'stars': round(score / 2, 1)
-            })
-
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    recommendations = recommendations[:10]
-
+    for college_id, score in ranked:
+        college = college_map.get(college_id)
+        if college is None:
+            continue
+        recommendations.append({
+            'college': college,
+            'score': round(score, 1),
+            'stars': round(score / 2, 1)
+        })
+
+    courses = params['preferred_courses']
     student_data = {
         'name': name,
         'email': email,
-        'marks': marks,
-        'category': category,
-        'preferred_course': ', '.join(normalized_courses) if normalized_courses else 'Any',
-        'preferred_location': preferred_location or 'Any',
-        'budget': budget,
-        'min_rating': min_rating
+        'marks': params['marks'],
+        'category': params['category'],
+        'preferred_course': ', '.join(courses) if courses else 'Any',
+        'preferred_location': params['preferred_location'] or 'Any',
+        'budget': params['budget'],
+        'min_rating': params['min_rating']
     }
 
     return {
         'student': student_data,
         'recommendations': recommendations
     }
+
+def prepare_recommendation_context(
+    name,
+    email,
+    marks,
+    category,
+    preferred_courses,
+    preferred_location,
+    budget,
+    min_rating,
+    limit=10,
+    strategy=None
+):
+    params = recommendation_params(
+        marks, category, preferred_courses, preferred_location, budget, min_rating, limit, strategy
+    )
+
+    def rank():
+        return catalog_snapshot.get_catalog().rank(**params)
+
+    ranked = result_cache.get_or_rank(params, rank)
+    college_map = get_colleges_with_rating_data().in_bulk([college_id for college_id, _ in ranked])
+    return build_recommendation_context(name, email, params, ranked, college_map)
+
+def recommendations_response(request, name, email, **inputs):
+    """Render the results page, or queue the ranking and redirect to its job when jobs are on"""
+    if jobs.enabled():
+        params = recommendation_params(**inputs)
+        job = jobs.enqueue(request.user, name, email, params)
+        return redirect('recommendation_job', job_id=job.pk)
+    context = prepare_recommendation_context(name=name, email=email, **inputs)
+    return render(request, 'recommendations/results.html', context)
+
+@login_required
+def recommendation_job(request, job_id):
+    """The results of a queued ranking, or a page polling for them"""
+    jobs.expire_stale_jobs(pk=job_id)
+    job = get_object_or_404(RecommendationJob, pk=job_id, user=request.user)
+    if job.status != RecommendationJob.DONE:
+        return render(request, 'recommendations/recommendation_job.html', {'job': job})
+    college_map = get_colleges_with_rating_data().in_bulk([college_id for college_id, _ in job.result])
+    context = build_recommendation_context(job.name, job.email, job.params, job.result, college_map)
+    return render(request, 'recommendations/results.html', context)
+
+@login_required
+def recommendation_job_status(request, job_id):
+    jobs.expire_stale_jobs(pk=job_id)
+    job = get_object_or_404(RecommendationJob, pk=job_id, user=request.user)
+    return JsonResponse({
+        'id': str(job.pk),
+        'status': job.status,
+        'wait_ms': None if job.wait_time is None else round(job.wait_time * 1000, 1),
+        'run_ms': None if job.run_time is None else round(job.run_time * 1000, 1),
+        'url': reverse('recommendation_job', args=[job.pk]),
+    })
     
-# @login_required
-def college_list(request):
-    colleges = get_colleges_with_rating_data()
+def apply_college_filters(colleges, search=None, location=None, course=None, fees=None, min_rating=None):
+    """Apply the college list filters as queryset expressions"""
+    if location:
+        # Matches the LOWER(location) index.
+        colleges = colleges.alias(location_lower=Lower('location')).filter(location_lower=Lower(Value(location)))
 
-    # Get distinct locations
-    locations = College.objects.values_list('location', flat=True).distinct().order_by('location')
-    locations = [loc for loc in locations if loc]
+    if course:
+        colleges = filter_by_courses(colleges, [course])
 
-    # Get all unique courses
-    all_courses = set()
-    for college in colleges:
-        courses = college.get_courses_list()
-        all_courses.update(courses)
-    all_courses = sorted(list(all_courses))
+    if fees:
+        try:
+            if fees.endswith('+'):
+                colleges = colleges.filter(annual_fees__gte=float(fees[:-1]))
+            else:
+                min_fees, max_fees = fees.split('-')
+                colleges = colleges.filter(annual_fees__gte=float(min_fees), annual_fees__lte=float(max_fees))
+        except ValueError:
+            pass
+
+    if min_rating:
+        try:
+            colleges = colleges.filter(display_rating__gte=float(min_rating))
+        except ValueError:
+            pass
 
-    # Get filters
-    search = request.GET.get('search')
-    location = request.GET.get('location')
-    course = request.GET.get('course')
-    fees = request.GET.get('fees')
-    min_rating = request.GET.get('min_rating')
+    if search:
+        # Last, so that only matches passing the other filters are listed.
+        colleges = filter_ids(colleges, search_ranked_ids(colleges, search))
 
-    filtered_colleges = []
+    return colleges
 
-    for college in colleges:
-        include = True
-
-        if search and search.lower() not in college.name.lower() and search.lower() not in college.location.lower():
-            include = False
-
-        if location and location != college.location:
-            include = False
-
-        if course:
-            courses = college.get_courses_list()
-            if course not in courses:
-                include = False
-
-        if fees:
-            try:
-                if fees.endswith('+'):
-                    min_fees = float(fees[:-1])
-                    if college.annual_fees < min_fees:
-                        include = False
-                else:
-                    min_fees, max_fees = fees.split('-')
-                    if not (float(min_fees) <= college.annual_fees <= float(max_fees)):
-                        include = False
-            except:
-                pass
-
-        if min_rating:
-            if college.display_rating < float(min_rating):
-                include = False
-
-        if include:
-            filtered_colleges.append(college)
-
-    filtered_colleges.sort(key=lambda x: x.display_rating, reverse=True)
-
-    if request.user.is_authenticated and filtered_colleges:
+def get_page_size(request, default=COLLEGE_LIST_PAGE_SIZE):
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+# @login_required
+def college_list(request):
+    search = request.GET.get('search')
+    colleges = apply_college_filters(
+        get_colleges_with_rating_data(),
+        location=request.GET.get('location'),
+        course=request.GET.get('course'),
+        fees=request.GET.get('fees'),
+        min_rating=request.GET.get('min_rating')
+    ).order_by('-display_rating', 'id')
+
+    if search:
+        # Best matches first: page through the ranked ids, then load the page.
+        paginator = Paginator(search_ranked_ids(colleges, search), get_page_size(request))
+        page_obj = paginator.get_page(request.GET.get('page'))
+        college_map = get_colleges_with_rating_data().in_bulk(page_obj.object_list)
+        page_colleges = [college_map[college_id] for college_id in page_obj.object_list if college_id in college_map]
+    else:
+        paginator = Paginator(colleges, get_page_size(request))
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_colleges = list(page_obj.object_list)
+
+    if request.user.is_authenticated and page_colleges:
         user_ratings = CollegeRating.objects.filter(
             user=request.user,
-            college_id__in=[college.id for college in filtered_colleges]
+            college_id__in=[college.id for college in page_colleges]
         ).values_list('college_id', 'rating')
         user_rating_map = dict(user_ratings)
-        for college in filtered_colleges:
+        for college in page_colleges:
             college.user_rating = user_rating_map.get(college.id)
 
     context = {
-        'colleges': filtered_colleges,
-        'locations': locations,
-        'all_courses': all_courses
+        'colleges': page_colleges,
+        'page_obj': page_obj,
+        'locations': facets.get_locations(),
+        'all_courses': facets.get_courses(),
+        **fragments.card_context(fragments.get_card_version())
     }
 
     return render(request, 'recommendations/college_list.html', context)
 @login_required
 def edit_profile(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = Student(user=request.user)
+    student = request.student or Student(user=request.user)
     
     if request.method == 'POST':
         # Update user information
@@ -331,12 +378,7 @@ def edit_profile(request):
         student.category = request.POST.get('category', 'General')
         
         # Handle preferred courses
-        preferred_courses = request.POST.get('preferred_courses', '')
-        if preferred_courses:
-            courses = [c.strip() for c in preferred_courses.split(',') if c.strip()]
-            student.preferred_courses = ','.join(courses)
-        else:
-            student.preferred_courses = ''
+        preferred_courses = split_list(request.POST.get('preferred_courses', ''))
         
         student.preferred_location = request.POST.get('preferred_location', '')
         
@@ -344,6 +386,7 @@ def edit_profile(request):
         student.budget = float(budget_val) if budget_val else 0
         
         student.save()
+        student.set_preferred_courses(preferred_courses)
         
         messages.success(request, 'Profile updated successfully!')
         return redirect('profile')
@@ -356,14 +399,9 @@ def edit_profile(request):
 
 @login_required
 def profile_view(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
-    
     context = {
         'user': request.user,
-        'student_profile': student
+        'student_profile': request.student
     }
     return render(request, 'recommendations/profile.html', context)
 
@@ -393,7 +431,8 @@ def generate_recommendations(request):
         }
         request.session['student_data'] = student_data
 
-        context = prepare_recommendation_context(
+        return recommendations_response(
+            request,
             name=name,
             email=email,
             marks=marks,
@@ -403,38 +442,19 @@ def generate_recommendations(request):
             budget=budget,
             min_rating=min_rating
         )
-        return render(request, 'recommendations/results.html', context)
     
     # GET request - show the form
     # Get all distinct courses and locations
-     
-    colleges = College.objects.all()
-    all_courses = set()
-    locations = set()
-    
-    for college in colleges:
-        if college.location:
-            locations.add(college.location)
-        courses = college.get_courses_list()
-        all_courses.update(courses)
-    
     context = {
-        'all_courses': sorted(list(all_courses)),
-        'locations': sorted(list(locations))
+        'all_courses': facets.get_courses(),
+        'locations': facets.get_locations()
     }
     return render(request, 'recommendations/generate_recommendations.html', context)
 
 def calculate_match_score(marks, category, preferred_courses, preferred_location, budget, college):
     """Calculate match score between student and college (0-10 scale)."""
     score = 0
-    weights = {
-        'cutoff': 0.30,
-        'course': 0.20,
-        'location': 0.15,
-        'budget': 0.15,
-        'placement': 0.10,
-        'review': 0.10
-    }
+    weights = MATCH_WEIGHTS
     
     # 1. Cutoff match (30%)
     cutoff = college.get_cutoff(category)
@@ -480,60 +500,82 @@ def calculate_match_score(marks, category, preferred_courses, preferred_location
     
     return score
 
+def parse_score(raw):
+    """A posted match score as a float, or None when missing or not a number"""
+    try:
+        score = float((raw or '').strip())
+    except ValueError:
+        return None
+    return score if math.isfinite(score) else None
+
+def save_rankings(request, scores):
+    """Save ``{college_id: score}`` for the logged-in student in one statement"""
+    student = get_or_create_student(request)
+    try:
+        with transaction.atomic():
+            Ranking.save_scores(student.pk, scores)
+    except IntegrityError:
+        # Foreign keys are checked on commit: the college does not exist, or
+        # the student was deleted after it was cached.
+        forget_students([request.user.pk])
+        raise Http404('No such college or student.')
+
 @login_required
 def save_college(request):
     if request.method == 'POST':
-        college_id = request.POST.get('college_id')
-        college = get_object_or_404(College, id=college_id)
-        student = Student.objects.filter(user=request.user).first()
-        if not student:
-            student = Student.objects.create(
-                user=request.user,
-                name=request.user.get_full_name().strip(),
-                email=request.user.email
-            )
-
-        score_raw = request.POST.get('score', '').strip()
-        score = None
-        if score_raw:
-            try:
-                score = float(score_raw)
-            except (TypeError, ValueError):
-                score = None
-
+        try:
+            college_id = int(request.POST.get('college_id', ''))
+        except ValueError:
+            raise Http404('No such college.')
+        score = parse_score(request.POST.get('score'))
         if score is None:
-            score = calculate_match_score(
-                marks=student.marks or 0,
-                category=student.category or 'General',
-                preferred_courses=student.get_preferred_courses_list(),
-                preferred_location=student.preferred_location or '',
-                budget=student.budget or 0,
-                college=college
-            )
-
-        score = round(score, 1)
-        star_rating = round(score / 2, 1)
-
-        Ranking.objects.update_or_create(
-            student=student,
-            college=college,
-            defaults={
-                'total_score': score,
-                'star_rating': star_rating
-            }
-        )
+            # Only scoring needs the college and the whole profile.
+            college = get_object_or_404(College, id=college_id)
+            score = float(get_strategy().score_many(get_or_create_student(request), [college])[0])
 
+        save_rankings(request, {college_id: score})
         messages.success(request, 'College saved successfully!')
         return redirect('college_list')
     return redirect('college_list')
 
+@login_required
+def save_colleges(request):
+    """Save up to MAX_BULK_SAVE recommendations from parallel ``college_id``/``score`` fields"""
+    if request.method != 'POST':
+        return redirect('saved_colleges')
+
+    raw_scores = request.POST.getlist('score')
+    scores = {}
+    for index, raw_id in enumerate(request.POST.getlist('college_id')[:MAX_BULK_SAVE]):
+        try:
+            college_id = int(raw_id)
+        except ValueError:
+            continue
+        scores[college_id] = parse_score(raw_scores[index] if index < len(raw_scores) else None)
+    # Unknown ids are dropped rather than failing the whole batch.
+    known = set(College.objects.filter(pk__in=scores).values_list('pk', flat=True))
+    scores = {college_id: score for college_id, score in scores.items() if college_id in known}
+    unscored = [college_id for college_id, score in scores.items() if score is None]
+    if unscored:
+        student = get_or_create_student(request)
+        colleges = list(College.objects.filter(pk__in=unscored))
+        for college, score in zip(colleges, get_strategy().score_many(student, colleges)):
+            scores[college.pk] = float(score)
+
+    if scores:
+        save_rankings(request, scores)
+        messages.success(request, f'Saved {len(scores)} colleges.')
+    else:
+        messages.info(request, 'No colleges to save.')
+    return redirect('saved_colleges')
+
 @login_required
 def saved_colleges(request):
-    student = Student.objects.filter(user=request.user).first()
+    student = request.student
     saved_items = []
 
     if student:
-        saved_rankings = Ranking.objects.filter(student=student).select_related('college').order_by(
+        saved_rankings = Ranking.objects.filter(student_id=student.pk).select_related('college').order_by(
             '-total_score',
             '-created_at'
         )
@@ -563,13 +605,13 @@ def remove_saved_college(request, college_id):
     if request.method != 'POST':
         return redirect('saved_colleges')
 
-    student = Student.objects.filter(user=request.user).first()
+    student = request.student
     if not student:
         messages.error(request, 'Student profile not found.')
         return redirect('saved_colleges')
 
     deleted_count, _ = Ranking.objects.filter(
-        student=student,
+        student_id=student.pk,
         college_id=college_id
     ).delete()
 
@@ -585,7 +627,6 @@ def rate_college(request, college_id):
     if request.method != 'POST':
         return redirect('college_detail', college_id=college_id)
 
-    college = get_object_or_404(College, id=college_id)
     rating_raw = request.POST.get('rating', '').strip()
 
     try:
@@ -598,11 +639,9 @@ def rate_college(request, college_id):
         messages.error(request, 'Please select a rating between 1 and 5.')
         return redirect('college_detail', college_id=college_id)
 
-    CollegeRating.objects.update_or_create(
-        college=college,
-        user=request.user,
-        defaults={'rating': rating_value}
-    )
+    if not CollegeRating.upsert(college_id, request.user.pk, rating_value):
+        raise Http404('No such college.')
+    signals.colleges_changed(college_id)
     messages.success(request, 'Your rating has been saved.')
 
     next_url = request.POST.get('next_url', '').strip()
@@ -631,25 +670,95 @@ def college_detail(request, college_id):
     }
     return render(request, 'recommendations/college_detail.html', context)
 
-def compare_colleges(request):
-    colleges = get_colleges_with_rating_data().order_by('name')
-    left_id = request.GET.get('left', '').strip()
-    right_id = request.GET.get('right', '').strip()
-
-    left_college = None
-    right_college = None
-
-    if left_id:
-        left_college = colleges.filter(id=left_id).first()
-
-    if right_id:
-        right_college = colleges.filter(id=right_id).first()
-
-    context = {
+def compare_ids(query):
+    """College ids to compare from ``?ids=1,2,3`` (or ``left``/``right``), deduplicated, in order"""
+    values = [value for ids in query.getlist('ids') for value in split_list(ids)]
+    values += [query.get('left', '').strip(), query.get('right', '').strip()]
+    college_ids = []
+    for value in values:
+        if value.isdigit() and int(value) not in college_ids:
+            college_ids.append(int(value))
+    return college_ids[:MAX_COMPARE_COLLEGES]
+
+def compare_cache_key(college_ids, version):
+    # Sorted, so every ordering of a popular pair shares one entry.
+    return f"recommendations:compare:{version}:{','.join(map(str, sorted(college_ids)))}"
+
+def get_compared_colleges(college_ids):
+    """``{id: college}`` for the compare page, read in one batch and cached per id set.
+
+    Entries live in the result cache under the catalog version, so any
+    college change retires them; frequently compared sets stay cached.
+    """
+    if not college_ids:
+        return {}
+    cache = result_cache.get_result_cache()
+    key = compare_cache_key(college_ids, result_cache.get_catalog_version())
+    college_map = cache.get(key)
+    if college_map is None:
+        college_map = get_colleges_with_rating_data().in_bulk(college_ids)
+        cache.set(key, college_map)
+    return college_map
+
+def compare_context(college_ids, college_map):
+    colleges = [college_map[college_id] for college_id in college_ids if college_id in college_map]
+    selected_ids = [college.id for college in colleges]
+    for college in colleges:
+        # The ids left after removing this college from the comparison.
+        college.compare_without = ','.join(str(college_id) for college_id in selected_ids if college_id != college.id)
+    return {
         'colleges': colleges,
-        'left_id': left_id,
-        'right_id': right_id,
-        'left_college': left_college,
-        'right_college': right_college
+        'college_ids': ','.join(map(str, selected_ids)),
+        'max_colleges': MAX_COMPARE_COLLEGES,
+        'columns': min(len(colleges), 3) or 1
     }
+
+def compare_colleges(request):
+    college_ids = compare_ids(request.GET)
+    context = compare_context(college_ids, get_compared_colleges(college_ids))
     return render(request, 'recommendations/compare_colleges.html', context)
+
+def lookup_colleges(query, limit=LOOKUP_LIMIT):
+    """Colleges whose name starts with ``query`` (then, for 3+ characters, contains it)"""
+    names = College.objects.alias(name_lower=Lower('name')).order_by('name_lower', 'id')
+    fields = ('id', 'name', 'location')
+    query = query.lower()
+    # A range on LOWER(name) rather than LIKE, so college_name_idx returns
+    # the matches in order and the scan stops at the limit.
+    matches = list(names.filter(name_lower__gte=query, name_lower__lt=query + '\U0010ffff').values(*fields)[:limit])
+    if len(matches) < limit and len(query) >= 3:
+        matches += names.filter(name__icontains=query).exclude(
+            id__in=[match['id'] for match in matches]
+        ).values(*fields)[:limit - len(matches)]
+    return matches
+
+def college_lookup(request):
+    """Type-ahead for the compare page: ``{'results': [{'id', 'name', 'location'}]}``"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', LOOKUP_LIMIT)), 1), MAX_LOOKUP_LIMIT)
+    except ValueError:
+        limit = LOOKUP_LIMIT
+    results = lookup_colleges(query, limit) if query else []
+    return JsonResponse({'results': results})
+
+def metrics_allowed(request):
+    """Staff users, a scraper sending ``Authorization: Bearer <METRICS_TOKEN>``, or INTERNAL_IPS"""
+    if request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(authorization, f'Bearer {token}'):
+        return True
+    # Behind a reverse proxy on the same host every request comes from
+    # 127.0.0.1; production settings empty INTERNAL_IPS for that reason.
+    return request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+def metrics(request):
+    """Per-view request and job metrics in the Prometheus text format (see ``metrics_allowed``)"""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        instrumentation.registry.render() + jobs.metrics.render(jobs.in_flight_counts()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,123 @@
+"""Pay a new worker's one-off costs before it takes traffic.
+
+A fresh process otherwise spends its first requests opening database
+connections, importing and resolving the URL configuration, compiling
+templates, loading translations, and building the facet cache, the catalog
+snapshot and the search index. ``warm_up`` does all of that up front and
+returns how long each step took. The database connections it opens are
+closed again at the end: under a server that loads the application before
+forking workers, each worker would otherwise inherit, and share, the same
+sockets.
+
+``wsgi.py`` and ``asgi.py`` call it when ``WARMUP_ON_STARTUP`` is on (the
+production settings turn it on), once the application is loaded. It is not
+run from ``AppConfig.ready()``: that also runs for every management command,
+and Django discourages queries there. ``manage.py warmup`` runs it by hand
+and ``manage.py bench_startup`` measures the time to first request with and
+without it.
+"""
+import gc
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import reverse
+from django.utils import translation
+
+from . import catalog_snapshot, facets, search
+
+logger = logging.getLogger(__name__)
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def close_connections():
+    # One inside a transaction (a test case) is still in use.
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def load_urls():
+    # Imports every view module and builds the reverse lookup tables.
+    reverse('home')
+
+
+def template_names():
+    """Names of this project's templates: the app's own and those in TEMPLATES DIRS"""
+    roots = [Path(apps.get_app_config('recommendations').path) / 'templates']
+    for engine in engines.all():
+        roots.extend(Path(directory) for directory in getattr(engine, 'dirs', ()))
+    names = set()
+    for root in roots:
+        if root.is_dir():
+            names.update(path.relative_to(root).as_posix() for path in root.rglob('*.html'))
+    return sorted(names)
+
+
+def compile_templates():
+    """Compile the project's templates into the (cached) template loaders"""
+    names = template_names()
+    for engine in engines.all():
+        for name in names:
+            engine.get_template(name)
+    return len(names)
+
+
+def load_translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Home')
+
+
+STEPS = [
+    ('database', open_connections),
+    ('urls', load_urls),
+    ('templates', compile_templates),
+    ('translations', load_translations),
+    ('facets', facets.get_facets),
+    ('catalog', catalog_snapshot.get_catalog),
+    ('search index', search.get_index),
+]
+
+
+def warm_up():
+    """Run every step in ``STEPS``; returns ``{step: seconds}`` for those that succeeded.
+
+    A failing step is logged and skipped: a cold cache is no reason not to
+    start serving.
+    """
+    timings = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Warmup step %r failed', name)
+            continue
+        timings[name] = time.perf_counter() - start
+    # Workers connect on their first query; the database step only timed it.
+    close_connections()
+    # The caches above are long-lived: collect once now and move them out of
+    # the collector's reach, instead of rescanning them in a full collection
+    # during a request (and, under a preforking server, touching every page
+    # the workers would otherwise share).
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        'Warmed up in %.0f ms (%s)',
+        sum(timings.values()) * 1000,
+        ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in timings.items())
+    )
+    return timings
+
+
+def warm_up_if_enabled():
+    if getattr(settings, 'WARMUP_ON_STARTUP', False):
+        warm_up()